@@ -0,0 +1,93 @@
+/* toggle-all */
+function toggleAll() {
+  const detailsList = document.querySelectorAll("details");
+  const allOpen = Array.from(detailsList).every(d => d.open);
+  detailsList.forEach(d => d.open = !allOpen);
+}
+
+/* flipbook */
+(function () {
+  // Shared by every flipbook on the page; repeated copies of this script are no-ops
+  if (window.pxpFlipbooks) return;
+  window.pxpFlipbooks = true;
+
+  function preload(book, slide) {
+    if (!slide) return;
+    const img = new Image();
+    if (slide.srcset) {
+      img.sizes = book.img.sizes;
+      img.srcset = slide.srcset;
+    }
+    img.src = slide.src;
+  }
+
+  function show(book) {
+    const slides = book.slides;
+    if (!slides.length) return;
+    const slide = slides[book.current];
+    if (slide.width) {
+      book.img.width = slide.width;
+      book.img.height = slide.height;
+    }
+    book.img.srcset = slide.srcset || "";
+    book.img.src = slide.src;
+    book.img.alt = slide.title || slide.caption;
+    book.caption.textContent = slide.caption;
+    // Only the current slide is loaded; its neighbours are warmed for the next click
+    preload(book, slides[(book.current + 1) % slides.length]);
+    preload(book, slides[(book.current - 1 + slides.length) % slides.length]);
+  }
+
+  function load(book) {
+    if (!book.loading) {
+      book.loading = fetch(book.el.dataset.flipbook)
+        .then(response => response.json())
+        .then(data => {
+          book.slides = data.images || [];
+          show(book);
+        });
+    }
+    return book.loading;
+  }
+
+  function init(el) {
+    const book = {
+      el: el,
+      img: el.querySelector(".flip-img"),
+      caption: el.querySelector(".flip-caption"),
+      current: 0,
+      slides: [],
+      loading: null
+    };
+    el.querySelectorAll("[data-flip]").forEach(button => {
+      button.addEventListener("click", () => load(book).then(() => {
+        const count = book.slides.length;
+        if (!count) return;
+        book.current = (book.current + Number(button.dataset.flip) + count) % count;
+        show(book);
+      }));
+    });
+    if ("IntersectionObserver" in window) {
+      const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+          observer.disconnect();
+          load(book);
+        }
+      }, { rootMargin: "200px" });
+      observer.observe(el);
+    } else {
+      load(book);
+    }
+  }
+
+  function initAll() {
+    document.querySelectorAll("[data-flipbook]").forEach(init);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initAll);
+  } else {
+    initAll();
+  }
+})();
+
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools", "generation"))
+
+# load_links finds the project root through mypyutils when the generator is imported
+pytest.importorskip("mypyutils")
+
+import generate
+
+
+def write_page(root, body):
+    page_json = root / "demo" / "_json" / "page.json"
+    page_json.parent.mkdir(parents=True)
+    page_json.write_text(json.dumps({"meta": {"title": "Demo"}, "body": body}), encoding="utf-8")
+    return ("demo", os.path.join("demo", "page.qmd"))
+
+
+def test_missing_table_file_fails_only_its_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    page = write_page(tmp_path, [{"type": "markdown-table", "table-path": "missing.csv"}])
+    assert generate.pending_scripts([page]) == {"demo": []}
+    page_key, deps, error, _ = generate.render_page(*page)
+    assert page_key == "demo" and deps is None
+    assert error.startswith("FileNotFoundError")
+
+
+def test_unsupported_table_file_fails_only_its_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "rows.xlsx").write_text("", encoding="utf-8")
+    page = write_page(tmp_path, [{"type": "markdown-table", "table-path": "rows.xlsx"}])
+    assert generate.pending_scripts([page]) == {"demo": []}
+    assert generate.render_page(*page)[2].startswith("ValueError")
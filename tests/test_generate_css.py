@@ -0,0 +1,107 @@
+import glob
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from css.generate_css import (
+    BUNDLE_EXCLUDE,
+    JSON_DIR,
+    blend_batch,
+    bundle_order,
+    drop_duplicate_custom_properties,
+    format_rgb,
+    generate_css,
+    parse_rgb,
+    sheet_order,
+    sheet_output,
+)
+from json_cache import load_json
+
+
+def test_later_declaration_wins():
+    css, dropped = drop_duplicate_custom_properties(":root{--a:1}:root{--a:2}")
+    assert css == ":root{--a:2}"
+    assert dropped == 1
+
+
+def test_important_declaration_survives_later_normal_one():
+    css, dropped = drop_duplicate_custom_properties(":root{--a:1 !important}:root{--a:2}")
+    assert css == ":root{--a:1 !important}"
+    assert dropped == 1
+
+
+def test_later_important_declaration_wins():
+    css, dropped = drop_duplicate_custom_properties(":root{--a:1 !important}:root{--a:2 !important}")
+    assert css == ":root{--a:2 !important}"
+    assert dropped == 1
+
+
+def test_other_selectors_and_at_rules_are_kept():
+    source = ":root{--a:1}.dark{--a:2}@media print{:root{--a:3}}"
+    assert drop_duplicate_custom_properties(source) == (source, 0)
+
+
+def test_bundle_includes_every_generated_site_sheet(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    generated = [sheet_output(load_json(f)) for f in sorted(glob.glob(f"{JSON_DIR}/*.json"))]
+    ordered = bundle_order(generated)
+    assert sorted(ordered) == sorted(set(generated) - BUNDLE_EXCLUDE)
+    # The token sheets every other sheet refers to lead, in _quarto.yml order
+    assert ordered[:2] == [os.path.normpath("assets/css/tokens.css"), os.path.normpath("assets/css/themes.css")]
+
+
+def test_bundle_rejects_sheets_without_a_spec(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with pytest.raises(ValueError, match="hand-written.css"):
+        bundle_order(["assets/css/tokens.css", "assets/css/hand-written.css"])
+
+
+def write_spec(path, output, reads=None):
+    section = {"initial_css_path": reads} if reads else {}
+    path.write_text(json.dumps({"meta": {"output_path": output}, "sections": [section]}), encoding="utf-8")
+    return str(path)
+
+
+def test_sheets_follow_the_sheets_they_read(tmp_path):
+    reader = write_spec(tmp_path / "a.json", "out/a.css", reads="out/z.css")
+    plain = write_spec(tmp_path / "b.json", "out/b.css")
+    source = write_spec(tmp_path / "z.json", "out/z.css")
+    assert sheet_order([reader, plain, source]) == [plain, source, reader]
+
+
+def test_circular_sheet_references_are_rejected(tmp_path):
+    a = write_spec(tmp_path / "a.json", "out/a.css", reads="out/b.css")
+    b = write_spec(tmp_path / "b.json", "out/b.css", reads="out/a.css")
+    with pytest.raises(ValueError, match="Circular"):
+        sheet_order([a, b])
+
+
+def baseline_mix(c1, c2, ratio):
+    """The scalar mix_colors from before the palette was batched."""
+    c1_list = [int(item.strip()) for item in c1.split(',')]
+    c2_list = [int(item.strip()) for item in c2.split(',')]
+    r = int(round(c1_list[0] * (1 - ratio) + c2_list[0] * ratio))
+    g = int(round(c1_list[1] * (1 - ratio) + c2_list[1] * ratio))
+    b = int(round(c1_list[2] * (1 - ratio) + c2_list[2] * ratio))
+    return f"{r}, {g}, {b}"
+
+
+def test_blend_batch_matches_baseline_mix():
+    colors = ["0, 0, 0", "255, 255, 255", "17, 128, 203", "250, 3, 99"]
+    targets = ["0, 0, 0", "255, 255, 255", "33, 37, 41", "248, 249, 250"]
+    for ratio in (0.05, 0.1, 0.12, 0.16, 0.25, 0.5, 0.9):
+        for target in targets:
+            batch = blend_batch([parse_rgb(c) for c in colors], parse_rgb(target), ratio)
+            assert [format_rgb(rgb) for rgb in batch] == [baseline_mix(c, target, ratio) for c in colors]
+
+
+def test_tokens_sheet_matches_committed_palette(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with open(os.path.join("assets", "css", "tokens.css"), encoding="utf-8") as f:
+        committed = f.read()
+    assert generate_css(load_json(os.path.join(JSON_DIR, "tokens.json"))) == committed
@@ -0,0 +1,51 @@
+import os
+import pickle
+import subprocess
+import sys
+
+TOOLS_DIR = os.path.join(os.path.dirname(__file__), "..", "tools")
+
+# Each writer runs in its own interpreter, like the page and CSS generators
+WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import json_cache
+json_cache.enable_disk_cache(sys.argv[2])
+for path in sys.argv[3:]:
+    json_cache.load_json(path)
+json_cache.save_disk_cache()
+"""
+
+
+def write_json(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def run_writer(pickle_path, *paths):
+    subprocess.run([sys.executable, "-c", WRITER, TOOLS_DIR, str(pickle_path), *paths], check=True)
+
+
+def saved_keys(pickle_path):
+    with open(pickle_path, "rb") as f:
+        return set(pickle.load(f))
+
+
+def test_writers_keep_each_others_entries(tmp_path):
+    pickle_path = tmp_path / "cache" / "json-cache.pickle"
+    pages = write_json(tmp_path / "page.json", '{"page": 1}')
+    sheet = write_json(tmp_path / "sheet.json", '{"sheet": 1}')
+    run_writer(pickle_path, pages)
+    run_writer(pickle_path, sheet)
+    assert saved_keys(pickle_path) == {os.path.normpath(pages), os.path.normpath(sheet)}
+    assert [p.name for p in pickle_path.parent.iterdir()] == ["json-cache.pickle"]
+
+
+def test_entries_for_changed_files_are_dropped(tmp_path):
+    pickle_path = tmp_path / "json-cache.pickle"
+    pages = write_json(tmp_path / "page.json", '{"page": 1}')
+    sheet = write_json(tmp_path / "sheet.json", '{"sheet": 1}')
+    run_writer(pickle_path, pages)
+    write_json(tmp_path / "page.json", '{"page": 22}')
+    run_writer(pickle_path, sheet)
+    assert saved_keys(pickle_path) == {os.path.normpath(sheet)}
@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from jupyterlite_cache import build_key
+
+
+def make_lite_dir(root):
+    (root / "files" / "data").mkdir(parents=True)
+    (root / "static").mkdir()
+    (root / "custom_css" / "static").mkdir(parents=True)
+    (root / "jupyter_lite_config.json").write_text(
+        json.dumps({"LiteBuildConfig": {"extra_static_paths": ["./static"]}}), encoding="utf-8"
+    )
+    (root / "files" / "intro.ipynb").write_text("{}", encoding="utf-8")
+    (root / "files" / "data" / "rows.csv").write_text("a,b\n1,2\n", encoding="utf-8")
+    (root / "static" / "tokens.css").write_text(":root{--a:1}", encoding="utf-8")
+    return root, root / "custom_css" / "static"
+
+
+def test_key_covers_extra_static_paths(tmp_path):
+    lite_dir, css_dir = make_lite_dir(tmp_path)
+    before = build_key(lite_dir, css_dir)
+    (lite_dir / "static" / "tokens.css").write_text(":root{--a:2}", encoding="utf-8")
+    assert build_key(lite_dir, css_dir) != before
+
+
+def test_key_covers_non_notebook_content(tmp_path):
+    lite_dir, css_dir = make_lite_dir(tmp_path)
+    before = build_key(lite_dir, css_dir)
+    (lite_dir / "files" / "data" / "rows.csv").write_text("a,b\n1,3\n", encoding="utf-8")
+    assert build_key(lite_dir, css_dir) != before
+
+
+def test_key_ignores_the_build_output(tmp_path):
+    lite_dir, css_dir = make_lite_dir(tmp_path)
+    before = build_key(lite_dir, css_dir)
+    (lite_dir / "jl-build").mkdir()
+    (lite_dir / "jl-build" / "index.html").write_text("<html></html>", encoding="utf-8")
+    assert build_key(lite_dir, css_dir) == before
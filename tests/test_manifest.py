@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools", "generation"))
+
+from manifest import BuildManifest, TrackedMap, recording, track_file
+
+
+def build(tmp_path, links, toolchain="v1"):
+    """Open the manifest the way one generation run does."""
+    return BuildManifest(tmp_path / "manifest.json", {"links": TrackedMap("links", links)}, toolchain)
+
+
+def render(tmp_path, manifest, links, page_key="demo"):
+    """Stand-in for render_page: read a link and a file, write the output, record the page."""
+    output = tmp_path / f"{page_key}.qmd"
+    with recording() as deps:
+        label = links["home"]["label"]
+        track_file(tmp_path / "page.json")
+        output.write_text(label, encoding="utf-8")
+    manifest.record(page_key, output, deps)
+    return output
+
+
+def first_run(tmp_path):
+    links = TrackedMap("links", {"home": {"label": "Home"}, "other": {"label": "Other"}})
+    (tmp_path / "page.json").write_text("{}", encoding="utf-8")
+    manifest = build(tmp_path, links)
+    output = render(tmp_path, manifest, links)
+    manifest.save(["demo"])
+    return links, output
+
+
+def test_unchanged_page_is_fresh(tmp_path):
+    links, output = first_run(tmp_path)
+    assert not build(tmp_path, links).is_stale("demo", output)
+
+
+def test_changed_file_dependency_is_stale(tmp_path):
+    links, output = first_run(tmp_path)
+    (tmp_path / "page.json").write_text('{"body": []}', encoding="utf-8")
+    assert build(tmp_path, links).is_stale("demo", output)
+
+
+def test_changed_shared_entry_is_stale_only_if_read(tmp_path):
+    links, output = first_run(tmp_path)
+    links["other"] = {"label": "Renamed"}
+    assert not build(tmp_path, links).is_stale("demo", output)
+    links["home"] = {"label": "Start"}
+    assert build(tmp_path, links).is_stale("demo", output)
+
+
+def test_edited_output_is_stale(tmp_path):
+    links, output = first_run(tmp_path)
+    output.write_text("Hand edited", encoding="utf-8")
+    assert build(tmp_path, links).is_stale("demo", output)
+
+
+def test_toolchain_bump_invalidates_every_page(tmp_path):
+    links, output = first_run(tmp_path)
+    manifest = build(tmp_path, links, toolchain="v2")
+    assert manifest.pages == {}
+    assert manifest.is_stale("demo", output)
+
+
+def test_removed_page_is_dropped_with_its_files(tmp_path):
+    links, output = first_run(tmp_path)
+    manifest = build(tmp_path, links)
+    manifest.save([])
+    reloaded = build(tmp_path, links)
+    assert reloaded.pages == {}
+    assert reloaded.files == {}
+    assert reloaded.is_stale("demo", output)
+
+
+def test_tracked_map_records_lookups_inside_recording():
+    links = TrackedMap("links", {"a": 1, "b": 2})
+    links["a"]
+    with recording() as outer:
+        links.get("b")
+        with recording() as inner:
+            links["a"]
+            links.get("missing")
+        assert inner == {("links", "a"), ("links", "missing")}
+    assert outer == {("links", "a"), ("links", "b"), ("links", "missing")}
+
+
+def test_hashing_shared_entries_is_not_a_dependency(tmp_path):
+    links = TrackedMap("links", {"a": 1})
+    manifest = build(tmp_path, links)
+    with recording() as deps:
+        manifest.dep_hash("links", "a")
+    assert deps == set()
@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools", "generation"))
+
+# page_ir reads the shared groups through load_links, which finds the project root with mypyutils
+pytest.importorskip("mypyutils")
+
+from page_ir import IRCache, compile_section
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path.name
+
+
+def test_json_path_chain_is_followed_to_the_end(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_json(tmp_path / "c.json", {"type": "markdown", "content": "from c"})
+    write_json(tmp_path / "b.json", {"json-path": "c.json", "title": "from b", "content": "from b"})
+    section = compile_section({"json-path": "b.json", "title": "inline"})
+    assert section == {"type": "markdown", "title": "from b", "content": "from c"}
+
+
+def test_json_path_cycle_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_json(tmp_path / "a.json", {"json-path": "b.json"})
+    write_json(tmp_path / "b.json", {"json-path": "a.json"})
+    assert compile_section({"json-path": "a.json"}) == {"skip-reason": "circular reference: a.json"}
+
+
+def test_json_path_cycle_through_tabs_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_json(tmp_path / "tabs.json", {
+        "type": "panel-tabset",
+        "tabs": [{"title": "Loop", "sections": [{"json-path": "tabs.json"}]}],
+    })
+    section = compile_section({"json-path": "tabs.json"})
+    assert section["tabs"][0]["sections"] == [{"skip-reason": "circular reference: tabs.json"}]
+
+
+def test_ir_cache_is_discarded_on_toolchain_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    page = write_json(tmp_path / "page.json", {"meta": {"title": "Demo"}, "body": []})
+    ir = IRCache(tmp_path / "cache", "v1").get_or_compile(page)
+    assert IRCache(tmp_path / "cache", "v1").load(page) == ir
+    assert IRCache(tmp_path / "cache", "v2").load(page) is None
+
+
+def test_ir_cache_is_discarded_when_a_nested_file_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_json(tmp_path / "nested.json", {"type": "markdown", "content": "old"})
+    page = write_json(tmp_path / "page.json", {"body": [{"json-path": "nested.json"}]})
+    IRCache(tmp_path / "cache", "v1").get_or_compile(page)
+    write_json(tmp_path / "nested.json", {"type": "markdown", "content": "newer"})
+    cache = IRCache(tmp_path / "cache", "v1")
+    assert cache.load(page) is None
+    assert cache.get_or_compile(page).body[0]["content"] == "newer"
@@ -0,0 +1,79 @@
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "tools", "generation"))
+
+from placeholders import PlaceholderEngine
+
+
+def real_link_map():
+    """links.json with icons.json merged in, as load_links builds it."""
+    link_map = {}
+    for name in ("links.json", "icons.json"):
+        with open(os.path.join(ROOT, "tools", "generation", "_json", name), encoding="utf-8") as f:
+            link_map.update(json.load(f))
+    return link_map
+
+
+def baseline_replace(content, link_map):
+    """The per-key str.replace loop the engine replaced."""
+    for key, value in link_map.items():
+        content = content.replace("{{{" + key + "}}}", value.get('link', ""))
+    return content
+
+
+def page_sources():
+    """Raw text of every page spec in the repo, placeholders included."""
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "**", "_json", "*.json"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return "\n".join(texts)
+
+
+def test_substitution_matches_baseline_on_real_link_map():
+    link_map = real_link_map()
+    content = page_sources() + "".join(f" {{{{{{{key}}}}}}} " for key in link_map)
+    assert "{{{" in content
+    substituted, used, unknown = PlaceholderEngine(link_map).substitute(content)
+    assert substituted == baseline_replace(content, link_map)
+    assert used == set(link_map)
+    # The page specs reference a few keys that are not in the link map; both versions keep them
+    assert unknown.isdisjoint(link_map)
+    assert all("{{{" + key + "}}}" in substituted for key in unknown)
+
+
+def test_unknown_keys_are_reported_and_left_in_place():
+    engine = PlaceholderEngine({"home": {"link": "[Home](/)"}, "bare": {}})
+    content, used, unknown = engine.substitute("{{{home}}} {{{nope}}} {{{bare}}} {{{nope}}} {{{}}}")
+    assert content == "[Home](/) {{{nope}}}  {{{nope}}} {{{}}}"
+    assert used == {"home", "bare"}
+    assert unknown == {"nope", ""}
+
+
+STREAM_LINKS = {"home": {"link": "[Home](/)"}, "faq": {"link": "[FAQ](/faq)"}}
+
+
+def stream(chunks):
+    used, unknown = set(), set()
+    out = "".join(PlaceholderEngine(STREAM_LINKS).substitute_stream(chunks, used, unknown))
+    return out, used, unknown
+
+
+def test_stream_matches_substitute_for_every_split():
+    text = "a {{{home}}}{{{faq}}} b {{{nope}}} {{ c }} {{{home}}}"
+    expected = PlaceholderEngine(STREAM_LINKS).substitute(text)
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            assert stream([text[:i], text[i:j], text[j:]]) == expected, (i, j)
+    assert stream(list(text)) == expected
+
+
+def test_stream_flushes_trailing_unmatched_braces():
+    for tail in ("{", "{{", "{{{", "{{{hom", "{{{home}", "{{{home}}"):
+        text = "see {{{home}}} " + tail
+        assert stream([text[:7], text[7:]]) == (f"see [Home](/) {tail}", {"home"}, set())
+        assert stream(list(text)) == (f"see [Home](/) {tail}", {"home"}, set())
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "tools"))
+
+from stages import Stage, stage_dependencies
+
+
+def noop():
+    pass
+
+
+def test_independent_stages_writing_the_same_tree_are_rejected():
+    stages = [
+        Stage("pages", noop, inputs=["pages"], outputs=["assets/flipbooks"]),
+        Stage("images", noop, inputs=["images"], outputs=["assets"]),
+    ]
+    with pytest.raises(ValueError, match="both write"):
+        stage_dependencies(stages)
+
+
+def test_a_stage_may_rewrite_what_an_upstream_stage_wrote():
+    stages = [
+        Stage("css", noop, inputs=["tools/css/json"], outputs=["assets/css"]),
+        Stage("css-prune", noop, inputs=["assets/css"], outputs=["assets/css/tokens.css"]),
+    ]
+    assert stage_dependencies(stages) == {"css": set(), "css-prune": {"css"}}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+bench_generation.py
+Time the page and CSS generators on synthetic sites of increasing size.
+
+Each size is built with synthetic_site.py in a temporary directory and
+measured in a fresh interpreter, because the generators load their shared
+link data at import time. Results are written as JSON so runs from
+different commits can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from synthetic_site import build_site
+
+TOOLS_DIR = Path(__file__).resolve().parents[1]
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def run_worker(site_dir, repeat):
+    """Measure every benchmark against the site in site_dir; runs inside the site."""
+    os.chdir(site_dir)
+    sys.path.insert(0, str(TOOLS_DIR / "generation"))
+    sys.path.insert(0, str(TOOLS_DIR / "css"))
+
+    from generate import generate_qmd_from_json, replace_placeholders
+    from renderers import format_markdown_table, render_section
+    from load_links import link_map, tables
+    from json_cache import load_json
+    from generate_css import generate_css
+
+    page_data = load_json("tools/generation/_json/links.json")
+    pages = []
+    for page_details in page_data.values():
+        if page_details.get("generate"):
+            path = Path(page_details["link"].strip("/"))
+            pages.append((load_json(str(path.parent / "_json" / f"{path.stem}.json")), path))
+
+    def all_pages():
+        for json_data, path in pages:
+            generate_qmd_from_json(json_data, path)
+
+    # One page body worth of placeholder-heavy content
+    content = "\n".join(
+        "Lorem ipsum {{{" + key + "}}} dolor sit amet."
+        for key in list(link_map)[:2000]
+    )
+    largest_table = max(tables.values(), key=len)
+    nested = {"type": "panel-tabset", "json-path": "shared/_json/nested/panel-0.json"}
+    css_configs = [load_json(str(p)) for p in sorted(Path("tools/css/json").glob("*.json"))]
+
+    def all_css():
+        for config in css_configs:
+            generate_css(config)
+
+    # Page output is noise here; keep only the benchmark JSON on stdout
+    devnull = open(os.devnull, "w")
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        results = {
+            "generate_qmd_from_json": best_of(all_pages, repeat),
+            "replace_placeholders": best_of(lambda: replace_placeholders(content), repeat),
+            "format_markdown_table": best_of(lambda: format_markdown_table(largest_table), repeat),
+            "write_section": best_of(lambda: render_section(nested), repeat),
+            "generate_css": best_of(all_css, repeat),
+        }
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+    results["_counts"] = {
+        "pages": len(pages),
+        "links": len(link_map),
+        "largest_table_rows": len(largest_table),
+        "css_sheets": len(css_configs),
+    }
+    print(json.dumps(results))
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=TOOLS_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(pages, repeat, extra_links=None):
+    with tempfile.TemporaryDirectory(prefix=f"pxp-bench-{pages}-") as site_dir:
+        params = build_site(site_dir, pages, extra_links=extra_links)
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", site_dir, "--repeat", str(repeat)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"benchmark worker failed for {pages} pages:\n{proc.stderr}")
+        measured = json.loads(proc.stdout.strip().splitlines()[-1])
+    counts = measured.pop("_counts")
+    return [
+        {"size": pages, "benchmark": name, "seconds": seconds, "params": params, "counts": counts}
+        for name, seconds in measured.items()
+    ]
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["size"], r["benchmark"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for r in current["results"]:
+        before = previous.get((r["size"], r["benchmark"]))
+        if before:
+            print(f"  {r['benchmark']:24} size={r['size']:<6} {before * 1000:10.2f} ms -> "
+                  f"{r['seconds'] * 1000:10.2f} ms  ({before / r['seconds']:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generation toolchain on synthetic sites.")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated page counts")
+    parser.add_argument("--extra-links", type=int, default=None,
+                        help="Reference links per site besides the pages (default: 4 per page)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is kept)")
+    parser.add_argument("--output", default="bench-results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.repeat)
+        return
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        start = time.perf_counter()
+        size_results = run_size(size, args.repeat, args.extra_links)
+        results += size_results
+        print(f"size={size:<6} done in {time.perf_counter() - start:.1f}s")
+        for r in size_results:
+            print(f"  {r['benchmark']:24} {r['seconds'] * 1000:10.2f} ms")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
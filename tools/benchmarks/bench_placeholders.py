@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+bench_placeholders.py
+Compare the single-pass PlaceholderEngine against the per-key str.replace loop.
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "generation"))
+from placeholders import PlaceholderEngine
+
+def replace_loop(content, link_map):
+    """The previous implementation: one str.replace over the page per key."""
+    for key, value in link_map.items():
+        placeholder = "{{{" + key + "}}}"
+        link = value.get('link', "")
+        content = content.replace(placeholder, link)
+    return content
+
+def make_link_map(n_keys):
+    return {
+        f"page-{i}": {"link": f"/section-{i % 20}/page-{i}.qmd", "label": f"Page {i}"}
+        for i in range(n_keys)
+    }
+
+def make_page(n_keys, n_paragraphs, placeholders_per_paragraph=3, seed=0):
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        refs = " ".join(
+            "[link]({{{page-" + str(rng.randrange(n_keys)) + "}}})"
+            for _ in range(placeholders_per_paragraph)
+        )
+        paragraphs.append(f"Lorem ipsum dolor sit amet, consectetur adipiscing elit. {refs}")
+    return "\n\n".join(paragraphs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Placeholder substitution benchmark.")
+    parser.add_argument("--keys", type=int, default=10_000, help="Entries in the link map")
+    parser.add_argument("--paragraphs", type=int, default=200, help="Paragraphs per page")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    link_map = make_link_map(args.keys)
+    page = make_page(args.keys, args.paragraphs)
+
+    build_time = timeit.timeit(lambda: PlaceholderEngine(link_map), number=1)
+    engine = PlaceholderEngine(link_map)
+    expected = replace_loop(page, link_map)
+    assert engine.substitute(page)[0] == expected, "engine output differs from str.replace loop"
+
+    loop_time = min(timeit.repeat(lambda: replace_loop(page, link_map), number=1, repeat=args.repeat))
+    engine_time = min(timeit.repeat(lambda: engine.substitute(page), number=1, repeat=args.repeat))
+
+    print(f"keys={args.keys} page_chars={len(page)}")
+    print(f"  engine build (once per run): {build_time * 1000:8.2f} ms")
+    print(f"  str.replace loop:            {loop_time * 1000:8.2f} ms/page")
+    print(f"  PlaceholderEngine:           {engine_time * 1000:8.2f} ms/page")
+    print(f"  speedup:                     {loop_time / engine_time:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+synthetic_site.py
+Generate a scalable synthetic Pixel Process content tree for benchmarking.
+
+The tree mirrors the real layout: page specs under <section>/_json/, shared
+link/icon/group/table data under tools/generation/_json/ and CSS specs under
+tools/css/json/. Everything scales from a single page count, except the number
+of extra (non-page) links, which can be set on its own to grow the link map
+independently of the page count.
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+def site_parameters(pages, extra_links=None):
+    """Derive the size of every synthetic input from the page count.
+
+    extra_links defaults to four reference links per page.
+    """
+    return {
+        "pages": pages,
+        "extra_links": pages * 4 if extra_links is None else extra_links,
+        "groups": max(4, pages // 10),
+        "group_size": 12,
+        "tables": max(4, pages // 5),
+        "table_rows": 50 + pages // 2,
+        "faq_groups": max(2, pages // 20),
+        "faqs_per_group": 40,
+        "nesting_depth": 6,
+        "brand_colors": max(8, pages // 10),
+        "css_sheets": max(4, pages // 25),
+    }
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+def page_link(i):
+    return f"/section-{i % 10}/page-{i}.qmd"
+
+def build_site(root, pages, seed=0, extra_links=None):
+    """Write a synthetic site with `pages` generated pages under root; returns its parameters."""
+    rng = random.Random(seed)
+    params = site_parameters(pages, extra_links)
+    root = Path(root)
+    (root / "_quarto.yml").write_text("project:\n  type: website\n", encoding="utf-8")
+    data_dir = root / "tools" / "generation" / "_json"
+
+    # Shared link data
+    links = {}
+    for i in range(pages):
+        links[f"page-{i}"] = {
+            "link": page_link(i),
+            "label": f"Page {i}",
+            "icon": "window-maximize",
+            "description": f"Synthetic page {i}",
+            "generate": True,
+        }
+    for i in range(params["extra_links"]):
+        links[f"ref-{i}"] = {
+            "link": f"/reference/ref-{i}.ipynb",
+            "label": f"Reference {i}",
+            "icon": "rectangle-list",
+            "description": f"Reference notebook {i}",
+        }
+    link_keys = list(links)
+    write_json(data_dir / "links.json", links)
+    write_json(data_dir / "icons.json", {
+        "branded-pxp": {"link": '<span class="pxp"><span>P</span><span>x</span><span>P</span></span>'},
+    })
+    write_json(data_dir / "groups.json", {
+        f"group-{g}": rng.sample(link_keys, params["group_size"])
+        for g in range(params["groups"])
+    })
+    write_json(data_dir / "tables.json", {
+        f"table-{t}": [
+            {"Example": f"value_{t}_{r}", "Valid?": "✅ Yes", "Reason": f"Row {r} of table {t}"}
+            for r in range(params["table_rows"])
+        ]
+        for t in range(params["tables"])
+    })
+
+    # Shared FAQ groups
+    faq_paths = []
+    for g in range(params["faq_groups"]):
+        path = f"shared/_json/faq-groups/faq-{g}.json"
+        write_json(root / path, [
+            {"question": f"Question {g}.{q}?", "answer": f"Answer {g}.{q} with {{{{{{page-{q % pages}}}}}}}."}
+            for q in range(params["faqs_per_group"])
+        ])
+        faq_paths.append(path)
+
+    # Deep json-path nesting: each panel file points at the next one
+    depth = params["nesting_depth"]
+    for d in range(depth):
+        sections = [{"type": "text", "markdown": f"Nested level {d} {{{{{{ref-{d}}}}}}}"}]
+        if d + 1 < depth:
+            sections.append({"type": "panel-tabset", "json-path": f"shared/_json/nested/panel-{d + 1}.json"})
+        write_json(root / f"shared/_json/nested/panel-{d}.json", {
+            "type": "panel-tabset",
+            "tabs": [{"title": f"Level {d}", "sections": sections}],
+        })
+
+    # Page specs
+    for i in range(pages):
+        refs = " ".join("{{{" + rng.choice(link_keys) + "}}}" for _ in range(5))
+        body = [
+            {"type": "header-block", "img": "/assets/images/experiment.png", "h1": f"Page {i}", "h2": "Synthetic"},
+            {"type": "header", "text": "Overview", "level": 2},
+            {"type": "text", "markdown": f"Links: {refs}"},
+            {"type": "quick-links", "page-list": rng.sample(link_keys, 5),
+             "page-groups": [f"group-{rng.randrange(params['groups'])}"]},
+            {"type": "markdown-table", "table-name": f"table-{rng.randrange(params['tables'])}"},
+            {"type": "panel-tabset", "json-path": "shared/_json/nested/panel-0.json"},
+            {"type": "faqs", "items_path": rng.choice(faq_paths)},
+        ]
+        path = Path(page_link(i).strip("/"))
+        write_json(root / path.parent / "_json" / f"{path.stem}.json", {
+            "meta": {"title": f"Page {i}", "format": "html"},
+            "body": body,
+        })
+
+    # CSS specs
+    css_dir = root / "tools" / "css" / "json"
+    write_json(css_dir / "tokens.json", {
+        "meta": {"output_path": "assets/css/tokens.css", "type": "tokens"},
+        "tokens": {
+            "spacing": {"base": "1.25rem"},
+            "alphas": [0.05, 0.1, 0.2, 0.3, 0.5, 1.0],
+            "brand-colors": {
+                f"brand-{c}": f"{rng.randrange(256)}, {rng.randrange(256)}, {rng.randrange(256)}"
+                for c in range(params["brand_colors"])
+            },
+            "base-colors": {
+                "fg-light": "26, 26, 26",
+                "shadow-light": "0, 0, 0",
+                "fg-dark": "224, 224, 224",
+                "shadow-dark": "255, 255, 255",
+            },
+        },
+    })
+    for s in range(params["css_sheets"]):
+        write_json(css_dir / f"sheet-{s}.json", {
+            "meta": {"output_path": f"assets/css/sheet-{s}.css", "type": "css"},
+            "sections": [
+                {
+                    "selector": f".component-{s}-{k}",
+                    "type": "css",
+                    "variables": [
+                        {"name": "color", "value": f"var(--brand-{k % params['brand_colors']}-050)"},
+                        {"name": "padding", "value": "var(--spacing-base)"},
+                    ],
+                }
+                for k in range(20)
+            ],
+        })
+    return params
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic site for benchmarking.")
+    parser.add_argument("output", help="Directory to create the site in")
+    parser.add_argument("--pages", type=int, default=100, help="Number of generated pages")
+    parser.add_argument("--extra-links", type=int, default=None,
+                        help="Reference links added to the link map besides the pages (default: 4 per page)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    params = build_site(args.output, args.pages, seed=args.seed, extra_links=args.extra_links)
+    print(json.dumps(params, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -9,27 +9,61 @@ import subprocess
 from pathlib import Path
 import argparse
 import sys
-import shutil
+import time
 from mypyutils import find_project_root, clean_directories
-from css.generate_css import css_gen_main
+from css.generate_css import (
+    PRUNE_REPORT,
+    PRUNE_SHEETS,
+    bundle_sheets,
+    css_gen_main,
+    generate_sheets,
+    prune_custom_properties,
+    sheet_output
+)
+from json_cache import load_json
+import profiling
+from jupyterlite_cache import JupyterLiteCache, build_key, sync_file
+from render_plan import execute_plan, plan_render, save_state
+from stages import BuildError, Stage, run_stages
+from watch import watch
 
-def run_generation_scripts(scripts_list):
-    # script_files = sorted(scripts_dir.glob(ext))
+CSS_JSON_DIR = Path("tools") / "css" / "json"
+SHARED_JSON_DIR = Path("tools") / "generation" / "_json"
+# Generated stylesheets copied into each JupyterLite build
+JUPYTERLITE_CSS = ['tokens.css', 'themes.css', 'jupyter-lite-custom.css']
 
-    if not scripts_list:
-        print(f"⚠️ No Python scripts set.")
-        return
+def page_targets():
+    """Return (page JSON files, QMD files) for the pages flagged with "generate" in links.json."""
+    inputs, outputs = [], []
+    for page_details in load_json(SHARED_JSON_DIR / "links.json").values():
+        if page_details.get("generate"):
+            path = Path(page_details.get("link", "").strip("/"))
+            inputs.append(path.parent / "_json" / f"{path.stem}.json")
+            outputs.append(path)
+    return inputs, outputs
+
+def generated_sheets():
+    """Output paths of the sheets generated from the CSS JSON specs."""
+    return [sheet_output(load_json(str(p))) for p in sorted(CSS_JSON_DIR.glob("*.json"))]
+
+def prune_css(bundle=False):
+    """Prune the token sheets against the generated pages and sheets, then bundle the result."""
+    with profiling.scope("css-sheet", "prune"):
+        prune_custom_properties()
+    if bundle:
+        with profiling.scope("css-sheet", "bundle"):
+            bundle_sheets(generated_sheets())
+
+def generate_pages(jobs=1, critical_css=False, search_index=False):
+    """Run page generation in this process; raises if any page fails.
 
-    for script in scripts_list:
-        print(f"\n⚙️ Running {script.name}...")
-        try:
-            subprocess.run(
-                [sys.executable, str(script)],
-                check=True,
-            )
-            print(f"✅ {script.name} completed successfully.")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ {script.name} failed with error code {e.returncode}")
+    Stages run in threads; generate.py starts its page workers from a fork
+    server, so they are never forked from this multi-threaded process.
+    """
+    generate = load_page_generator()
+    errors = generate.generate_site(jobs=jobs, critical_css=critical_css, search_index=search_index)
+    if errors:
+        raise RuntimeError(f"{len(errors)} page(s) failed to generate")
 
 def jupyterlite_build(path, project_path):
     static_path = path / "custom_css" / "static"
@@ -37,20 +71,101 @@ def jupyterlite_build(path, project_path):
     if not static_path.exists():
         static_path.mkdir(parents=True, exist_ok=True)
         print(f"Directory '{static_path}' created successfully.")
-    css_copies = ['tokens.css', 'themes.css', 'jupyter-lite-custom.css']
-    for css_file in css_copies:
+    for css_file in JUPYTERLITE_CSS:
         source_css = project_path / "assets" / "css" / css_file
         destination_css = static_path / css_file
-        shutil.copyfile(source_css, destination_css)
+        # Unchanged copies keep their mtime, so JupyterLite sees nothing new
+        sync_file(source_css, destination_css)
 
+    cache = JupyterLiteCache(path)
+    key = build_key(path, static_path)
+    if cache.current_key() == key:
+        print(f"✅ JupyterLite build in {path} is up to date ({key})")
+        return
+    if cache.restore(key):
+        print(f"♻️ Restored JupyterLite build in {path} from cache ({key})")
+        return
     subprocess.run(["jupyter", "lite", "build", "--output-dir", "jl-build"], cwd=path,check=True)
+    cache.store(key)
 
-def run_quarto_preview(project_root):
+def run_quarto_preview(project_root, render=True):
     """
-    Launch Quarto preview.
+    Launch Quarto preview; render=False serves the existing output without re-rendering.
     """
     print("\n🚀 Launching Quarto preview...")
-    subprocess.run(["quarto", "preview"], cwd=project_root, check=False)
+    command = ["quarto", "preview"] + ([] if render else ["--no-render"])
+    subprocess.run(command, cwd=project_root, check=False)
+
+def render_site(project_root):
+    """Render only what changed since the last successful render; returns False on failure."""
+    plan, snapshot = plan_render(project_root)
+    print(f"\n🗺️ Render plan: {plan.describe()}")
+    if plan.mode == "none":
+        return True
+    try:
+        execute_plan(project_root, plan, output_dir=snapshot["output_dir"])
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"❌ Quarto render failed: {e}")
+        return False
+    save_state(project_root, snapshot)
+    return True
+
+def load_page_generator():
+    """Import generate.py in-process; its modules expect tools/generation on sys.path."""
+    generation_dir = str(Path(__file__).resolve().parent / "generation")
+    if generation_dir not in sys.path:
+        sys.path.insert(0, generation_dir)
+    import generate
+    return generate
+
+def is_watched_json(path):
+    """Page specs live in any _json directory; CSS specs in tools/css/json."""
+    path = Path(path)
+    return path.suffix == ".json" and ("_json" in path.parts or path.parent.match(str(CSS_JSON_DIR)))
+
+def run_watch(project_root, skip_preview=False, bundle_css=False, search_index=False):
+    """
+    Keep the page and CSS generators loaded and rebuild only what changed.
+
+    Page JSON changes go through the incremental build manifest, so only the
+    affected pages are regenerated; CSS JSON changes regenerate the changed
+    sheets and the sheets that read their output. Changes to the generator
+    source itself need a restart.
+    """
+    os.chdir(project_root)
+    generate = load_page_generator()
+    links_path = SHARED_JSON_DIR / "links.json"
+
+    def rebuild(changed):
+        start = time.perf_counter()
+        css_changed = [p for p in changed if Path(p).parent == CSS_JSON_DIR]
+        page_changed = [p for p in changed if p not in css_changed]
+        print(f"\n🔄 Changed: {', '.join(sorted(changed))}")
+        if css_changed:
+            generate_sheets(json_dir=str(CSS_JSON_DIR), changed=css_changed)
+            if bundle_css:
+                bundle_sheets(generated_sheets())
+        if page_changed:
+            if any(Path(p).parent == SHARED_JSON_DIR for p in page_changed):
+                generate.refresh_shared_data()
+            generate.pxp_setup(generate.load_json(links_path), search_index=search_index)
+        print(f"⚡ Rebuilt in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # Initial pass brings outputs up to date; unchanged pages are skipped
+    generate.pxp_setup(generate.load_json(links_path), search_index=search_index)
+    css_gen_main(bundle=bundle_css)
+
+    preview = None
+    if not skip_preview:
+        print("\n🚀 Launching Quarto preview...")
+        preview = subprocess.Popen(["quarto", "preview"], cwd=project_root)
+
+    print(f"\n👀 Watching for JSON changes in {project_root} (Ctrl+C to stop)")
+    try:
+        watch(project_root, is_watched_json, rebuild)
+    finally:
+        if preview:
+            preview.terminate()
 
 def main():
     parser = argparse.ArgumentParser(description="General Quarto project builder.")
@@ -63,13 +178,71 @@ def main():
     parser.add_argument(
         "--skip-preview",
         action="store_true",
-        help="Skip running 'quarto preview'",
+        help="Skip running 'quarto preview' (and the 'quarto render' before it): quarto is not invoked",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep _site, .quarto and the JupyterLite builds and render only the pages and "
+             "resources that changed since the last render",
+    )
+    parser.add_argument(
+        "--skip-render",
+        action="store_true",
+        help="Skip the 'quarto render' step (preview then renders everything itself)",
     )
     parser.add_argument(
         "--clean-only",
         action="store_true",
         help="Only clean directories, do not run scripts or preview",
     )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Skip cleaning, keep the generators loaded and rebuild pages/CSS as JSON changes",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for page generation (0 = one per CPU core, default: 1)",
+    )
+    parser.add_argument(
+        "--bundle-css",
+        action="store_true",
+        help="Also write a minified, content-hashed assets/css/site.<hash>.css bundle",
+    )
+    parser.add_argument(
+        "--prune-css",
+        action="store_true",
+        help="Drop unused custom properties from tokens.css/themes.css once the pages are generated",
+    )
+    parser.add_argument(
+        "--critical-css",
+        action="store_true",
+        help="Inline each page's component CSS and load the other component sheets deferred",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Build the client-side search index used by search sections (assets/search; "
+             "list it under project resources in _quarto.yml to publish it)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-profile.json",
+        default=None,
+        metavar="REPORT",
+        help="Record per-stage, per-page, per-renderer and per-sheet timings and peak memory "
+             "to a JSON report (default: build-profile.json). Stages and pages run serially.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=15,
+        help="Entries per category in the printed profile summary (default: 15)",
+    )
 
     args = parser.parse_args()
 
@@ -80,6 +253,17 @@ def main():
         project_root = find_project_root()
 
     print(f"📂 Using project root: {project_root}")
+    # Generators resolve their JSON and output paths relative to the project root
+    os.chdir(project_root)
+
+    if args.watch:
+        run_watch(
+            project_root,
+            skip_preview=args.skip_preview,
+            bundle_css=args.bundle_css,
+            search_index=args.search_index,
+        )
+        return
 
     # Directories to clean (easily extendable)
     clean_dirs = [
@@ -88,36 +272,99 @@ def main():
         "_includes/generated",
     ]
 
-    for c_dir in clean_dirs:
-        clean_directories(base_dir=project_root, target_name=c_dir)
-
     jupyterlite_paths = [
         "jump-in/jl-notebooks"
     ]
 
-    for jl_dir in jupyterlite_paths:
-        build_dir = os.path.join(jl_dir, "jl-build")
-        clean_directories(base_dir=project_root, target_name=build_dir)
+    # Keeping _site and .quarto lets the render plan re-render only what changed
+    if not args.incremental or args.clean_only:
+        for c_dir in clean_dirs:
+            clean_directories(base_dir=project_root, target_name=c_dir)
+
+        for jl_dir in jupyterlite_paths:
+            build_dir = os.path.join(jl_dir, "jl-build")
+            clean_directories(base_dir=project_root, target_name=build_dir)
 
     if args.clean_only:
         print("🧹 Clean-only mode complete.")
         return
 
-    # Run generation scripts
-    gen_path = project_root / "tools" / "generation" / "generate.py"
+    # Stages declare what they read and write; independent ones run concurrently
+    page_inputs, page_outputs = page_targets()
+    stages = [
+        Stage(
+            "pages",
+            lambda: generate_pages(jobs=args.jobs, critical_css=args.critical_css, search_index=args.search_index),
+            inputs=[
+                SHARED_JSON_DIR,
+                # Page generation indexes the images and writes their responsive derivatives
+                "assets/images",
+                *page_inputs,
+                # Critical CSS inlines the component sheets; the pruned token sheets are not among them
+                *([p for p in generated_sheets() if p not in PRUNE_SHEETS] if args.critical_css else []),
+            ],
+            outputs=[
+                *page_outputs,
+                "assets/search",
+                "assets/tables",
+                "assets/flipbooks",
+                "assets/js",
+                "assets/images/responsive",
+                # Build manifest, page IR cache and search index state
+                "tools/generation/.cache",
+            ],
+        ),
+        Stage(
+            "css",
+            # With pruning, the bundle is written once the token sheets are pruned
+            lambda: css_gen_main(bundle=args.bundle_css and not args.prune_css),
+            inputs=[CSS_JSON_DIR],
+            outputs=["assets/css"],
+        ),
+    ]
+    if args.prune_css:
+        stages.append(Stage(
+            "css-prune",
+            lambda: prune_css(bundle=args.bundle_css),
+            # Scans the generated pages and sheets for var() references
+            inputs=["assets/css", *page_outputs],
+            outputs=[*PRUNE_SHEETS, PRUNE_REPORT],
+        ))
+    for path in jupyterlite_paths:
+        build_path = project_root / Path(path)
+        stages.append(Stage(
+            f"jupyterlite:{path}",
+            lambda build_path=build_path: jupyterlite_build(build_path, project_path=project_root),
+            inputs=[f"assets/css/{css_file}" for css_file in JUPYTERLITE_CSS] + [path],
+            outputs=[f"{path}/jl-build", f"{path}/custom_css/static"],
+        ))
 
-    run_generation_scripts(scripts_list=[gen_path])
+    if args.profile:
+        profiling.enable()
 
-    css_gen_main()
+    try:
+        # Serial stages keep per-stage peak memory from overlapping
+        run_stages(stages, max_workers=1 if args.profile else None)
+    except BuildError as e:
+        print(f"\n❌ Build failed: {e}")
+        if e.skipped:
+            print(f"⏭️ Skipped: {', '.join(e.skipped)}")
+        sys.exit(1)
+    finally:
+        if args.profile:
+            profiling.write_report(args.profile, top_n=args.profile_top)
 
-    for path in jupyterlite_paths:
-        build_path = project_root / Path(path)
-        jupyterlite_build(build_path, project_path=project_root)
+    if args.skip_preview:
+        # CI and offline builds stop after generation; quarto may not be installed
+        print("⏭️ Skipping Quarto render and preview.")
+        return
 
-    if not args.skip_preview:
-        run_quarto_preview(project_root)
-    else:
-        print("⏭️ Skipping Quarto preview.")
+    rendered = False
+    if not args.skip_render:
+        rendered = render_site(project_root)
+        if not rendered:
+            sys.exit(1)
+    run_quarto_preview(project_root, render=not rendered)
 
 if __name__ == "__main__":
     main()
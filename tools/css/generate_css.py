@@ -1,10 +1,32 @@
 import re
 import os
+import sys
 import glob
 import json
+import yaml
+import hashlib
+import argparse
 from pathlib import Path
 
-from mypyutils import find_project_root
+# tools/ holds modules shared with the page pipeline (json_cache)
+tools_dir = str(Path(__file__).resolve().parents[1])
+if tools_dir not in sys.path:
+    sys.path.insert(0, tools_dir)
+
+from json_cache import (
+    cache_stats,
+    enable_disk_cache,
+    load_json,
+    save_disk_cache
+)
+from profiling import (
+    profiled_function,
+    scope
+)
+from watch import SKIP_DIRS
+
+JSON_CACHE_PATH = Path("tools") / ".cache" / "json-cache.pickle"
+JSON_DIR = os.path.join("tools", "css", "json")
 
 # ==========================
 # Renderer Registry
@@ -14,7 +36,8 @@ RENDERERS = {}
 def register_renderer(type_name):
     """Decorator to register a renderer for a given type."""
     def decorator(func):
-        RENDERERS[type_name] = func
+        # The registry entry is profiled when build_all.py --profile is active
+        RENDERERS[type_name] = profiled_function("css-renderer", type_name, func)
         return func
     return decorator
 
@@ -22,35 +45,16 @@ def register_renderer(type_name):
 def render_root(section: dict) -> str:
     token_data = section.get("tokens", {})
     lines = [":root {"]
-    for key, value in flatten_dict(token_data, skip_list=["brand-colors", "base-colors", "alphas"]):
+    for key, value in flatten_dict(token_data, skip_list=["brand-colors", "base-colors", "alphas", "ramps"]):
         css_var = f"--{key}".replace("_", "-")
         lines.append(f"  {css_var}: {value};")
-    brand_colors = token_data.get("brand-colors", {})
-    base_colors = token_data.get("base-colors", {})
-    alpha_values = token_data.get("alphas", {})
-    formatted_alphas = [f"{int(v*100):03d}" for v in alpha_values]
-    blend_colors = {}
-    for color_name, rgb in base_colors.items():
-        base_var = f"--{color_name}"
-        lines.append(f"  {base_var}: rgba({rgb}, 1);")
-        if 'shadow' in color_name:
-            blend_colors[color_name]=rgb
-
-    for color_name, rgb in brand_colors.items():
-        base_var = f"--{color_name}"
-        for blend_color_name, blend_color_rgb in blend_colors.items():
-            if 'light' in blend_color_name:
-                mix_name = f"{base_var}-light-blend"
-                mix_rgb = mix_colors(rgb, blend_color_rgb, .12)
-
-            elif 'dark' in blend_color_name:
-                mix_name = f"{base_var}-dark-blend"
-                mix_rgb = mix_colors(rgb, blend_color_rgb, .16)
-            lines.append(f"  {mix_name}: rgba({mix_rgb}, 1);")
-
-        for alpha, alpha_val in zip(alpha_values,formatted_alphas):
-            lines.append(f"  {base_var}-{alpha_val}: rgba({rgb}, {alpha});")
-
+    palette = Palette(
+        brand_colors=token_data.get("brand-colors", {}),
+        base_colors=token_data.get("base-colors", {}),
+        alphas=token_data.get("alphas", []),
+        ramps=token_data.get("ramps", {}),
+    )
+    lines.extend(palette.css_lines())
     lines.append("}")
     return "\n".join(lines)
 
@@ -67,7 +71,7 @@ def render_theme_subset(section: dict) -> str:
     selector = section["selector"]
     remove = section["remove"]
     input_css = section["initial_css_path"]
-    css_dict = parse_root_css_variables(input_css)
+    css_dict = root_variables(input_css)
     select_vars = {k: v for k, v in css_dict.items() if remove in k}
     renamed_vars = {
         k.replace(remove, ""): v for k, v in select_vars.items()
@@ -81,14 +85,15 @@ def render_theme_subset(section: dict) -> str:
 # ==========================
 # Utility Functions
 # ==========================
-def load_json(path: str) -> dict:
-    """Load a JSON file and return its content as a dictionary."""
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
 def write_css(path: str, content: str):
-    """Write CSS content to a file."""
+    """Write CSS content to a file, leaving it untouched if the content is unchanged."""
     Path(path).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
     with open(path, "w", encoding="utf-8") as f:
         f.write(content)
 
@@ -104,18 +109,8 @@ def flatten_dict(d, prefix="", skip_list=[]):
             items.append((new_key, v))
     return items
 
-def parse_root_css_variables(css_path: str) -> dict:
-    """Parse CSS custom properties from the :root block into a dictionary.
-
-    Args:
-        css_path (str): Path to the CSS file.
-
-    Returns:
-        dict: Mapping of variable names to values.
-    """
-    with open(css_path, "r") as f:
-        css = f.read()
-
+def parse_root_css_text(css: str) -> dict:
+    """Parse CSS custom properties from the first :root block of CSS text into a dictionary."""
     # Extract contents of :root { ... }
     root_match = re.search(r":root\s*{([^}]*)}", css, re.DOTALL)
     if not root_match:
@@ -132,13 +127,126 @@ def parse_root_css_variables(css_path: str) -> dict:
 
     return variables
 
+def parse_root_css_variables(css_path: str) -> dict:
+    """Parse CSS custom properties from the :root block into a dictionary.
+
+    Args:
+        css_path (str): Path to the CSS file.
+
+    Returns:
+        dict: Mapping of variable names to values.
+    """
+    with open(css_path, "r") as f:
+        css = f.read()
+    return parse_root_css_text(css)
+
+# ==========================
+# Variable Registry
+# ==========================
+# :root variables of every sheet generated in this process, keyed by output path
+CSS_VARIABLES = {}
+
+def register_sheet_variables(output_path: str, css: str):
+    """Record the :root variables of a freshly generated sheet for later sections."""
+    CSS_VARIABLES[os.path.normpath(output_path)] = parse_root_css_text(css)
+
+def root_variables(css_path: str) -> dict:
+    """Return a sheet's :root variables from the registry, falling back to the file on disk."""
+    registered = CSS_VARIABLES.get(os.path.normpath(css_path))
+    if registered is not None:
+        return registered
+    return parse_root_css_variables(css_path)
+
+def parse_rgb(rgb: str) -> tuple:
+    """Parse an "r, g, b" string into a tuple of ints."""
+    return tuple(int(item.strip()) for item in rgb.split(','))
+
+def format_rgb(rgb: tuple) -> str:
+    return f"{rgb[0]}, {rgb[1]}, {rgb[2]}"
+
+def blend_batch(colors: list, target: tuple, ratio: float) -> list:
+    """Mix each parsed color with `target` at `ratio`.
+
+    A plain per-color loop, not vectorized: batching only saves re-parsing the
+    target and recomputing `1 - ratio` for every brand color. The arithmetic is
+    the same as the original scalar mix_colors, so the output is unchanged.
+    """
+    keep = 1 - ratio
+    tr, tg, tb = target
+    return [
+        (
+            int(round(r * keep + tr * ratio)),
+            int(round(g * keep + tg * ratio)),
+            int(round(b * keep + tb * ratio)),
+        )
+        for r, g, b in colors
+    ]
+
 def mix_colors(c1, c2, ratio):
-    c1_list = [int(item.strip()) for item in c1.split(',')]
-    c2_list = [int(item.strip()) for item in c2.split(',')]
-    r = int(round(c1_list[0] * (1 - ratio) + c2_list[0] * ratio))
-    g = int(round(c1_list[1] * (1 - ratio) + c2_list[1] * ratio))
-    b = int(round(c1_list[2] * (1 - ratio) + c2_list[2] * ratio))
-    return f"{r}, {g}, {b}"
+    return format_rgb(blend_batch([parse_rgb(c1)], parse_rgb(c2), ratio)[0])
+
+# ==========================
+# Palette Engine
+# ==========================
+# Blend ratio applied to brand colors for each shadow base color variant
+BLEND_RATIOS = {"light": .12, "dark": .16}
+RAMP_TARGETS = {"tint": (255, 255, 255), "shade": (0, 0, 0)}
+
+class Palette:
+    """Token palette: every color string is parsed once and each variant is mixed
+    for all brand colors through one blend_batch call (a loop, not vectorized).
+
+    Emits, per brand color: a light/dark blend against each shadow base color,
+    an rgba variant per alpha (--<color>-005 ... --<color>-100) and, when
+    `ramps` is set (e.g. {"tint": [0.1, 0.2], "shade": [0.1]}), tint/shade
+    steps mixed towards white/black (--<color>-tint-010).
+    """
+    def __init__(self, brand_colors: dict, base_colors: dict, alphas: list, ramps: dict = None):
+        self.brand_names = list(brand_colors)
+        self.brand_strings = list(brand_colors.values())
+        self.brand_rgb = [parse_rgb(rgb) for rgb in self.brand_strings]
+        self.base_colors = base_colors
+        self.alphas = list(alphas)
+        self.ramps = ramps or {}
+
+    def blend_columns(self):
+        """Return [(suffix, [rgb per brand color])] for every shadow base color."""
+        columns = []
+        for blend_color_name, blend_color_rgb in self.base_colors.items():
+            if 'shadow' not in blend_color_name:
+                continue
+            for variant, ratio in BLEND_RATIOS.items():
+                if variant in blend_color_name:
+                    mixed = blend_batch(self.brand_rgb, parse_rgb(blend_color_rgb), ratio)
+                    columns.append((f"{variant}-blend", mixed))
+                    break
+        return columns
+
+    def ramp_columns(self):
+        """Return [(suffix, [rgb per brand color])] for every configured tint/shade step."""
+        columns = []
+        for ramp, steps in self.ramps.items():
+            target = RAMP_TARGETS.get(ramp)
+            if target is None:
+                raise ValueError(f"Unknown ramp '{ramp}' (expected one of {', '.join(RAMP_TARGETS)})")
+            for step in steps:
+                columns.append((f"{ramp}-{int(step*100):03d}", blend_batch(self.brand_rgb, target, step)))
+        return columns
+
+    def css_lines(self) -> list:
+        lines = [f"  --{color_name}: rgba({rgb}, 1);" for color_name, rgb in self.base_colors.items()]
+        blends = self.blend_columns()
+        ramps = self.ramp_columns()
+        alpha_suffixes = [(f"{int(v*100):03d}", v) for v in self.alphas]
+        for i, (color_name, rgb) in enumerate(zip(self.brand_names, self.brand_strings)):
+            base_var = f"--{color_name}"
+            for suffix, mixed in blends:
+                lines.append(f"  {base_var}-{suffix}: rgba({format_rgb(mixed[i])}, 1);")
+            for alpha_val, alpha in alpha_suffixes:
+                lines.append(f"  {base_var}-{alpha_val}: rgba({rgb}, {alpha});")
+            for suffix, mixed in ramps:
+                lines.append(f"  {base_var}-{suffix}: rgba({format_rgb(mixed[i])}, 1);")
+        return lines
 
 # ==========================
 # CSS Generation Logic
@@ -162,28 +270,398 @@ def generate_css(config: dict) -> str:
         rendered_sections.append(renderer(config))
     return "\n\n".join(rendered_sections)
 
-def generate_sheets(json_dir):
-    json_files = glob.glob(f'{json_dir}/*.json')
-    print(len(json_files))
-    print(os.getcwd())
-    print(json_dir)
-    json_files.sort(key=lambda f: (os.path.basename(f) != "tokens.json", f))
-    for json_file in json_files:
+def sheet_inputs(json_data: dict) -> set:
+    """Return the CSS files a sheet reads while rendering (remove-qualifier sources)."""
+    return {
+        os.path.normpath(sec["initial_css_path"])
+        for sec in json_data.get("sections", [])
+        if "initial_css_path" in sec
+    }
+
+def sheet_output(json_data: dict) -> str:
+    return os.path.normpath(json_data.get("meta", {}).get("output_path", "output.css"))
+
+def affected_sheets(json_files, changed) -> list:
+    """Return the sheets in `changed` plus every sheet that reads their output, transitively."""
+    changed = {os.path.normpath(f) for f in changed}
+    selected = [f for f in json_files if os.path.normpath(f) in changed]
+    outputs = set()
+    while True:
+        outputs |= {sheet_output(load_json(f)) for f in selected}
+        dependents = [
+            f for f in json_files
+            if f not in selected and sheet_inputs(load_json(f)) & outputs
+        ]
+        if not dependents:
+            return [f for f in json_files if f in selected]
+        selected += dependents
+
+def sheet_order(json_files, key=None) -> list:
+    """Return json_files in dependency order; a sheet follows the sheets whose output it reads.
+
+    Dependencies come from initial_css_path references to other sheets' outputs.
+    Of the sheets whose dependencies are placed, the smallest by `key`
+    (default: position in json_files) goes next.
+    """
+    producers = {sheet_output(load_json(f)): f for f in json_files}
+    deps = {
+        f: {producers[i] for i in sheet_inputs(load_json(f)) if i in producers} - {f}
+        for f in json_files
+    }
+    key = key or json_files.index
+    ordered = []
+    done = set()
+    while len(ordered) < len(json_files):
+        ready = [f for f in json_files if f not in done and deps[f] <= done]
+        if not ready:
+            cycle = sorted(f for f in json_files if f not in done)
+            raise ValueError(f"Circular initial_css_path references between: {', '.join(cycle)}")
+        sheet = min(ready, key=key)
+        ordered.append(sheet)
+        done.add(sheet)
+    return ordered
+
+def generate_sheet(json_file):
+    """Render one sheet, write it and register its variables for dependent sheets."""
+    with scope("css-sheet", os.path.basename(json_file)):
         json_data = load_json(json_file)
         output_path = json_data.get("meta", {}).get("output_path", "output.css")
         render_page = generate_css(json_data)
         write_css(output_path, render_page)
+        register_sheet_variables(output_path, render_page)
+    return output_path
+
+def generate_sheets(json_dir, changed=None):
+    """Render every sheet in json_dir, or only the `changed` JSON files and their dependents.
+
+    Returns the output paths written, in dependency order. Sheets render one
+    after another: all 22 render in about 2 ms, and a thread pool was slower.
+    """
+    json_files = sorted(glob.glob(f'{json_dir}/*.json'))
+    if changed is not None:
+        json_files = affected_sheets(json_files, changed)
+    return [generate_sheet(json_file) for json_file in sheet_order(json_files)]
+
+# ==========================
+# Dead Variable Elimination
+# ==========================
+# Token sheets whose unused custom properties can be pruned after generation
+PRUNE_SHEETS = [os.path.normpath("assets/css/tokens.css"), os.path.normpath("assets/css/themes.css")]
+PRUNE_REPORT = "css-prune-report.json"
+
+VAR_REFERENCE = re.compile(r"var\(\s*(--[\w-]+)")
+DECLARATION_LINE = re.compile(r"^\s*(--[\w-]+)\s*:\s*(.*?);\s*$")
+EMPTY_BLOCK = re.compile(r"^[^{}\n]+\{\n\}\n*", re.MULTILINE)
+
+def usage_sources(root=".", exclude=()) -> list:
+    """Files that may reference token variables: sheets, pages and HTML partials."""
+    exclude = {os.path.normpath(p) for p in exclude}
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and d != "custom_css"]
+        for name in filenames:
+            path = os.path.normpath(os.path.join(dirpath, name))
+            if path in exclude or name.startswith("site."):
+                continue
+            if name.endswith(".qmd") or (
+                path.startswith(os.path.normpath("assets") + os.sep) and name.endswith((".css", ".html"))
+            ):
+                sources.append(path)
+    return sorted(sources)
+
+def prune_custom_properties(sheets=PRUNE_SHEETS, report_path=PRUNE_REPORT) -> dict:
+    """Remove custom properties from `sheets` that nothing references, transitively.
+
+    A variable is kept if any usage source (other sheets, .qmd pages, HTML
+    partials, including the JupyterLite stylesheet) references it with var(),
+    or if the value of a kept variable does. Writes a JSON report of what was
+    removed and returns it.
+    """
+    texts = {}
+    definitions = {}
+    roots = set()
+    for sheet in sheets:
+        with open(sheet, "r", encoding="utf-8") as f:
+            texts[sheet] = f.read()
+        for line in texts[sheet].splitlines():
+            match = DECLARATION_LINE.match(line)
+            if match:
+                definitions.setdefault(match.group(1), []).append(match.group(2))
+            else:
+                roots.update(VAR_REFERENCE.findall(line))
+
+    sources = usage_sources(exclude=sheets)
+    for source in sources:
+        with open(source, "r", encoding="utf-8", errors="ignore") as f:
+            roots.update(VAR_REFERENCE.findall(f.read()))
+
+    used = set()
+    pending = [name for name in roots if name in definitions]
+    while pending:
+        name = pending.pop()
+        if name in used:
+            continue
+        used.add(name)
+        for value in definitions[name]:
+            pending.extend(ref for ref in VAR_REFERENCE.findall(value) if ref in definitions)
+
+    report = {"sources": len(sources), "sheets": {}}
+    for sheet, text in texts.items():
+        kept_lines, removed = [], []
+        for line in text.splitlines(keepends=True):
+            match = DECLARATION_LINE.match(line)
+            if match and match.group(1) not in used:
+                removed.append(match.group(1))
+                continue
+            kept_lines.append(line)
+        pruned = EMPTY_BLOCK.sub("", "".join(kept_lines)).rstrip("\n")
+        if removed:
+            write_css(sheet, pruned)
+        report["sheets"][Path(sheet).as_posix()] = {
+            "removed": removed,
+            "kept": sum(1 for line in kept_lines if DECLARATION_LINE.match(line)),
+            "bytes_before": len(text.encode("utf-8")),
+            "bytes_after": len(pruned.encode("utf-8")),
+        }
+        print(f"✂️ Pruned {len(removed)} unused custom properties from {sheet}")
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Prune report written to {report_path}")
+    return report
+
+# ==========================
+# CSS Bundling
+# ==========================
+BUNDLE_DIR = Path("assets") / "css"
+BUNDLE_MANIFEST = BUNDLE_DIR / "bundle-manifest.json"
+# Generated sheets the site does not load; the JupyterLite build gets its own copy
+BUNDLE_EXCLUDE = {os.path.normpath("assets/css/jupyter-lite-custom.css")}
+
+# Quoted strings, comments, then whitespace runs; strings are kept verbatim
+CSS_TOKEN_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+', re.DOTALL)
+PUNCTUATION = set("{};,>")
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace without touching string contents."""
+    out = []
+    pos = 0
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        out.append(css[pos:match.start()])
+        token = match.group(0)
+        pos = match.end()
+        if token.startswith(("\"", "'")):
+            out.append(token)
+        elif token.startswith("/*"):
+            continue
+        else:
+            prev = out[-1][-1:] if out and out[-1] else ""
+            nxt = css[pos:pos + 1]
+            # Whitespace only matters between two value/selector characters
+            if prev and nxt and prev not in PUNCTUATION and prev != ":" and nxt not in PUNCTUATION:
+                out.append(" ")
+    out.append(css[pos:])
+    return "".join(out).replace(";}", "}").strip()
+
+def split_top_level(css: str, sep: str) -> list:
+    """Split minified CSS on `sep`, ignoring separators inside strings, parens or braces."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(css):
+        if quote:
+            if ch == quote and css[i - 1] != "\\":
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "({":
+            depth += 1
+        elif ch in ")}":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(css[start:i])
+            start = i + 1
+    parts.append(css[start:])
+    return parts
+
+def css_rules(css: str) -> list:
+    """Split minified CSS into top-level (prelude, body) rules; @-blocks keep their body raw."""
+    rules, depth, start, prelude = [], 0, 0, None
+    quote = None
+    for i, ch in enumerate(css):
+        if quote:
+            if ch == quote and css[i - 1] != "\\":
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            if depth == 0:
+                prelude = css[start:i]
+                start = i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+    return rules
+
+IMPORTANT = re.compile(r"!\s*important\s*$", re.IGNORECASE)
+
+def drop_duplicate_custom_properties(css: str) -> tuple:
+    """Remove custom-property declarations overridden by the same top-level selector.
+
+    Of the declarations of one property under an identical selector, the last
+    !important one wins, or the last one if none is !important; the others are
+    dead weight. Declarations inside @-rules are kept.
+    Returns (css, number of declarations dropped).
+    """
+    rules = css_rules(css)
+    parsed = []
+    winners = {}
+    for r, (prelude, body) in enumerate(rules):
+        if prelude.startswith("@"):
+            parsed.append((prelude, None, body))
+            continue
+        decls = [d for d in split_top_level(body, ";") if d]
+        parsed.append((prelude, decls, body))
+        for d, decl in enumerate(decls):
+            name = decl.split(":", 1)[0]
+            if not name.startswith("--"):
+                continue
+            important = bool(IMPORTANT.search(decl))
+            # A normal declaration never overrides an earlier !important one
+            if important or not winners.get((prelude, name), (None, False))[1]:
+                winners[(prelude, name)] = ((r, d), important)
+
+    last_seen = {key: position for key, (position, _) in winners.items()}
+    dropped = 0
+    out = []
+    for r, (prelude, decls, body) in enumerate(parsed):
+        if decls is None:
+            out.append(f"{prelude}{{{body}}}")
+            continue
+        kept = []
+        for d, decl in enumerate(decls):
+            name = decl.split(":", 1)[0]
+            key = (prelude, name)
+            if key in last_seen and last_seen[key] != (r, d):
+                dropped += 1
+                continue
+            kept.append(decl)
+        if kept:
+            out.append(f"{prelude}{{{';'.join(kept)}}}")
+    return "".join(out), dropped
+
+def quarto_css_order() -> dict:
+    """Position of each sheet in _quarto.yml format.html.css, or {} without a config."""
+    try:
+        with open("_quarto.yml", "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        listed = config["format"]["html"]["css"]
+    except (OSError, KeyError, TypeError):
+        return {}
+    return {os.path.normpath(p): i for i, p in enumerate(listed)}
+
+def bundle_order(sheets: list, json_dir=JSON_DIR) -> list:
+    """Order output sheets for the bundle: dependency order, then cascade order.
+
+    A sheet follows the sheets it reads (see sheet_order). Where the
+    dependencies leave a choice, the sheets _quarto.yml loads on every page
+    keep their config order and the per-page component sheets follow by
+    name. Only BUNDLE_EXCLUDE is left out; a sheet no CSS spec in json_dir
+    produces cannot be placed and raises ValueError.
+    """
+    wanted = {os.path.normpath(p) for p in sheets} - BUNDLE_EXCLUDE
+    listed = quarto_css_order()
+
+    def cascade(json_file):
+        output = sheet_output(load_json(json_file))
+        return output not in listed, listed.get(output, 0), output
+
+    json_files = sorted(glob.glob(f"{json_dir}/*.json"))
+    outputs = (sheet_output(load_json(f)) for f in sheet_order(json_files, key=cascade))
+    ordered = [p for p in outputs if p in wanted]
+    unplaced = sorted(wanted - set(ordered))
+    if unplaced:
+        raise ValueError(f"No CSS spec in {json_dir} produces {', '.join(unplaced)}; cannot order it in the bundle")
+    return ordered
+
+def bundle_sheets(sheets: list) -> dict:
+    """Merge, minify and dedupe sheets into a content-hashed bundle plus manifest."""
+    ordered = bundle_order(sheets)
+    excluded = sorted({os.path.normpath(p) for p in sheets} & BUNDLE_EXCLUDE)
+    parts = []
+    original_bytes = 0
+    for sheet in ordered:
+        with open(sheet, "r", encoding="utf-8") as f:
+            css = f.read()
+        original_bytes += len(css.encode("utf-8"))
+        parts.append(minify_css(css))
+    bundled, dropped = drop_duplicate_custom_properties("".join(parts))
+    data = bundled.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    bundle_path = BUNDLE_DIR / f"site.{digest}.css"
+
+    for stale in BUNDLE_DIR.glob("site.*.css"):
+        if stale != bundle_path:
+            stale.unlink()
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(bundle_path, "wb") as f:
+        f.write(data)
+
+    manifest = {
+        "bundle": bundle_path.as_posix(),
+        "hash": digest,
+        "sheets": [Path(p).as_posix() for p in ordered],
+        "excluded": [Path(p).as_posix() for p in excluded],
+        "original_bytes": original_bytes,
+        "bundle_bytes": len(data),
+        "dropped_custom_properties": dropped,
+    }
+    with open(BUNDLE_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(
+        f"📦 Bundled {len(ordered)} sheets into {manifest['bundle']} "
+        f"({original_bytes} -> {len(data)} bytes, {dropped} duplicate custom properties dropped)"
+    )
+    if excluded:
+        print(f"   Not bundled (loaded outside the site): {', '.join(manifest['excluded'])}")
+    return manifest
 
-def css_gen_main():
-    json_dir = 'tools/css/json'
-    generate_sheets(json_dir=json_dir)
+def css_gen_main(bundle=False, prune=False):
+    json_dir = JSON_DIR
+    enable_disk_cache(JSON_CACHE_PATH)
+    outputs = generate_sheets(json_dir=json_dir)
+    save_disk_cache()
+    print("JSON cache: {hits} hits, {disk_hits} disk hits, {misses} misses".format(**cache_stats()))
+    if prune:
+        # Runs on the written files; the variable registry keeps the full token set
+        with scope("css-sheet", "prune"):
+            prune_custom_properties()
+    if bundle:
+        with scope("css-sheet", "bundle"):
+            bundle_sheets(outputs)
 
 # ==========================
 # CLI Entry Point
 # ==========================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate CSS sheets from JSON specs.")
+    parser.add_argument(
+        "--bundle",
+        action="store_true",
+        help="Also write a minified, content-hashed site.<hash>.css bundle and manifest",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Drop custom properties from tokens.css/themes.css that no sheet, page or partial uses "
+             "(run after the pages are generated)",
+    )
+    args = parser.parse_args()
+    # Only the command line needs the project root; importing this module must not require mypyutils
+    from mypyutils import find_project_root
     find_project_root(marker="_quarto.yml", set_path=True)
-    css_gen_main()
+    css_gen_main(bundle=args.bundle, prune=args.prune)
 
 
 
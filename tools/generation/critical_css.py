@@ -0,0 +1,80 @@
+"""
+critical_css.py
+Per-page component CSS for generated pages.
+
+Each renderer declares the component stylesheets its markup needs
+(register_renderer(..., sheets=[...])). _quarto.yml only loads the layout
+sheets (tokens, themes, navbar, headers, tab-cards, ...) on every page, so
+a generated page links the component sheets for the section types in its
+body. With critical CSS it inlines them minified instead and loads the other
+component sheets deferred, so first paint only waits on what the page shows.
+Hand-written pages list the component sheets they use in their front matter.
+"""
+import posixpath
+import re
+from pathlib import Path
+
+from css.generate_css import minify_css
+from manifest import track_file
+from page_ir import iter_section_types
+from renderers import RENDERER_SHEETS
+
+CSS_DIR = Path("assets") / "css"
+CSS_URL = "/assets/css"
+URL_PATTERN = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+
+def absolute_urls(css):
+    """Resolve relative url()s against the sheet's location; inlined, they would resolve against the page."""
+    def resolve(match):
+        quote, url = match.groups()
+        if re.match(r"^([a-z][a-z0-9+.-]*:|/|#)", url, re.IGNORECASE):
+            return match.group(0)
+        return f"url({quote}{posixpath.normpath(posixpath.join(CSS_URL, url))}{quote})"
+    return URL_PATTERN.sub(resolve, css)
+
+def component_sheets():
+    """Every stylesheet claimed by a renderer, in first-registration order."""
+    return list(dict.fromkeys(sheet for sheets in RENDERER_SHEETS.values() for sheet in sheets))
+
+def page_sheets(body):
+    """Component stylesheets used by a compiled page body, in registration order."""
+    used = {sheet for section_type in iter_section_types(body) for sheet in RENDERER_SHEETS.get(section_type, ())}
+    return [sheet for sheet in component_sheets() if sheet in used]
+
+def component_css_block(body, critical=False):
+    """Return a raw HTML block loading the page's component CSS, or "" if it uses none.
+
+    With critical the page's sheets are inlined and the other component
+    sheets are loaded deferred; otherwise the page's sheets are linked.
+    """
+    used = page_sheets(body)
+    lines = ["```{=html}"]
+    if not critical:
+        if not used:
+            return ""
+        lines.extend(f'<link rel="stylesheet" href="{CSS_URL}/{sheet}">' for sheet in used)
+        lines.append("```")
+        return "\n".join(lines) + "\n"
+
+    styles = []
+    for sheet in used:
+        path = CSS_DIR / sheet
+        track_file(str(path))
+        with open(path, "r", encoding="utf-8") as f:
+            styles.append(absolute_urls(minify_css(f.read())))
+    if styles:
+        lines.append(f'<style data-critical="{" ".join(used)}">{"".join(styles)}</style>')
+    for sheet in component_sheets():
+        if sheet in used:
+            continue
+        href = f"{CSS_URL}/{sheet}"
+        lines.append(f'<link rel="stylesheet" href="{href}" media="print" onload="this.media=\'all\'">')
+        lines.append(f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+    lines.append("```")
+    return "\n".join(lines) + "\n"
+
+def globally_loaded(quarto_config):
+    """Component sheets _quarto.yml loads on every page (render-blocking, and never deferred)."""
+    listed = quarto_config.get("format", {}).get("html", {}).get("css", []) or []
+    names = {Path(p).name for p in listed}
+    return [sheet for sheet in component_sheets() if sheet in names]
@@ -1,64 +1,367 @@
+import argparse
+import filecmp
+import multiprocessing
+import os
+import shutil
+import sys
 import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-from load_links import link_map
+import load_links
+from critical_css import component_css_block, globally_loaded
+from images import refresh_index
+from load_links import link_map, groups, tables
+from manifest import (
+    BuildManifest,
+    recording,
+    toolchain_hash,
+    track
+)
+from page_ir import IRCache, compile_page, thaw
+from placeholders import PlaceholderEngine
+from script_bundle import (
+    build_script_bundle,
+    current_bundle_url,
+    page_scripts,
+    script_block
+)
+from table_sources import remove_stale_tables
+from search_index import forget_search_state, page_document, update_search_index
+from profiling import (
+    is_enabled as profiling_enabled,
+    profile_transform,
+    scope
+)
 from renderers import (
   RENDERERS,
+  remove_stale_flipbooks,
   write_section
 )
-from mypyutils import (
-    find_project_root, 
-    load_json
-) 
+from json_cache import (
+    cache_stats,
+    enable_disk_cache,
+    load_json,
+    save_disk_cache
+)
+from mypyutils import find_project_root
+
+MANIFEST_PATH = Path("tools") / "generation" / ".cache" / "manifest.json"
+JSON_CACHE_PATH = Path("tools") / ".cache" / "json-cache.pickle"
+IR_CACHE_DIR = Path("tools") / "generation" / ".cache" / "ir"
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+# Modules outside tools/generation whose behaviour ends up in the pages
+SHARED_SOURCES = [
+    TOOLS_DIR / "json_cache.py",
+    TOOLS_DIR / "profiling.py",
+    TOOLS_DIR / "css" / "generate_css.py",
+]
+
+# Built once per run (and once per worker process) from the loaded link map
+placeholder_engine = PlaceholderEngine(link_map)
+ir_cache = IRCache(IR_CACHE_DIR, toolchain_hash(Path(__file__).parent, SHARED_SOURCES))
 
 # -----------------------
 # Page Generation
 # -----------------------
 def generate_qmd_from_json(json_data, output_path):
-    meta = json_data.get("meta", {})
-    body = json_data.get("body", [])
+    return generate_qmd_from_ir(compile_page(json_data), output_path)
+
+def generate_qmd_from_ir(ir, output_path, critical_css=False, script_bundle=None):
+    meta = thaw(ir.meta)
+    body = ir.body
 
     yaml_header = yaml.dump(meta, sort_keys=False)
     # Wrap in front matter
     qmd_header = f"---\n{yaml_header}---\n"
+    track("options", "critical-css")
+    styles = component_css_block(body, critical=critical_css)
+    if styles:
+        qmd_header += "\n" + styles
+    scripts = script_block(body, script_bundle)
+    if scripts:
+        track("options", "script-bundle")
+        qmd_header += "\n" + scripts
 
-    # Body content
-    content = "".join(write_section(item) for item in body)
-    content = replace_placeholders(content)
+    # Body content, streamed section by section through placeholder substitution
+    chunks = (chunk for item in body for chunk in write_section(item))
 
-    # Save
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(qmd_header + content)
+    # Save via a temporary file so a failing renderer never leaves a partial page
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(qmd_header)
+            for chunk in stream_placeholders(chunks, source=output_path):
+                f.write(chunk)
+        # Identical output keeps its mtime so Quarto and the render plan see no change
+        if output_path.exists():
+            if filecmp.cmp(tmp_path, output_path, shallow=False):
+                print(f"Unchanged: {output_path}")
+                return output_path
+            # Replacing the file must not reset its permissions
+            shutil.copymode(output_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
 
     print(f"Saved: {output_path}")
     return output_path
 
-def pxp_setup(page_data):
-    for page_details in page_data.values():
-        build = page_details.get('generate')
-        if build:
-            page_path = page_details.get('link', "")
-            path = Path(page_path.strip("/"))
-            stem = path.stem
-            parent = path.parent
-            json_path = str(parent / "_json" / f"{stem}.json")
-            json_data = load_json(json_path)
-            if json_data:
-                generate_qmd_from_json(json_data, path)
-
-def replace_placeholders(content):
-    for key, value in link_map.items():
-        placeholder = "{{{" + key + "}}}"
-        link = value.get('link', "")
-        content = content.replace(placeholder, link)
-    return content
+def page_json_path(page_path):
+    path = Path(page_path)
+    return str(path.parent / "_json" / f"{path.stem}.json")
+
+def render_page(page_key, page_path, critical_css=False, script_bundle=None, search_index=False):
+    """Render a single page and return (page_key, deps, error, search document).
+
+    The search document is only built with search_index. Safe to run in a
+    worker process.
+    """
+    path = Path(page_path)
+    document = None
+    try:
+        with recording() as deps, scope("page", page_key):
+            ir = ir_cache.get_or_compile(page_json_path(path))
+            if ir:
+                generate_qmd_from_ir(ir, path, critical_css=critical_css, script_bundle=script_bundle)
+                if search_index:
+                    document = page_document(dict.get(link_map, page_key, {}), ir)
+    except Exception as e:
+        return page_key, None, f"{type(e).__name__}: {e}", None
+    return page_key, deps, None, document
+
+def pxp_setup(page_data, force=False, jobs=1, critical_css=False, search_index=False):
+    """Generate every page flagged with "generate", skipping pages whose inputs are unchanged.
+
+    With jobs > 1 pages are rendered in a process pool. Each worker imports
+    load_links once, so the link map, groups and tables are loaded once per
+    worker rather than once per page. Workers are never forked from this
+    process, which may be running other build stages in threads. Each page links the component CSS it
+    uses; with critical_css it inlines it and defers the rest. Script modules
+    used anywhere on the site are written once as a shared bundle. With search_index the
+    search index is updated from the pages rendered in this run; without it
+    the published index is kept and rebuilt in full by the next search_index
+    run. Returns a list of (page_key, error).
+    """
+    targets = [
+        (page_key, Path(page_details.get('link', "").strip("/")))
+        for page_key, page_details in page_data.items()
+        if page_details.get('generate')
+    ]
+    # Saved before any worker starts, so workers read derivatives instead of encoding them
+    image_index = refresh_index()
+    # Pages referencing the bundle are checked against the one the last run wrote
+    options = {"critical-css": critical_css, "script-bundle": current_bundle_url()}
+    manifest = BuildManifest(
+        MANIFEST_PATH,
+        shared={
+            "links": link_map,
+            "groups": groups,
+            "tables": tables,
+            "images": image_index.images,
+            "options": options,
+        },
+        toolchain=ir_cache.toolchain,
+    )
+    warn_global_component_sheets()
+    page_keys = {page_key for page_key, _ in targets}
+    stale_pages = lambda: [
+        (page_key, path) for page_key, path in targets
+        if force or manifest.is_stale(page_key, path)
+    ]
+    pending = stale_pages()
+
+    # Only pending pages are compiled; unchanged pages keep the modules recorded last run
+    scripts = {page_key: manifest.scripts(page_key) for page_key in page_keys}
+    scripts.update(pending_scripts(pending))
+    script_bundle = build_script_bundle(name for names in scripts.values() for name in names)
+    if script_bundle != options["script-bundle"]:
+        # Every page that links the bundle now points at a different file
+        options["script-bundle"] = script_bundle
+        manifest.forget("options", "script-bundle")
+        pending = stale_pages()
+        scripts.update(pending_scripts(pending))
+
+    # Profiling renders serially so per-page records stay in this process
+    if jobs > 1 and len(pending) > 1 and not profiling_enabled():
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=worker_context()) as pool:
+            results = list(pool.map(
+                render_page,
+                *zip(*pending),
+                [critical_css] * len(pending),
+                [script_bundle] * len(pending),
+                [search_index] * len(pending),
+                chunksize=chunksize,
+            ))
+    else:
+        results = [render_page(page_key, path, critical_css, script_bundle, search_index) for page_key, path in pending]
+
+    paths = dict(pending)
+    errors = []
+    documents = {}
+    for page_key, deps, error, document in results:
+        if error:
+            errors.append((page_key, error))
+            continue
+        manifest.record(page_key, paths[page_key], deps, scripts=scripts[page_key])
+        if document:
+            documents[page_key] = document
+    manifest.save(page_keys)
+    tracked_files = manifest.tracked_files()
+    remove_stale_flipbooks(tracked_files)
+    remove_stale_tables(tracked_files)
+
+    if search_index:
+        update_search_index(page_data, documents, compile_page_ir)
+    else:
+        if pending:
+            # The index no longer matches the pages; the next --search-index run rebuilds it
+            forget_search_state()
+        searching = sorted(page_key for page_key in page_keys if "search" in scripts[page_key])
+        if searching:
+            print(f"⚠️ Search sections need --search-index, which this run skipped: {', '.join(searching)}")
+
+    skipped = len(page_keys) - len(pending)
+    if skipped:
+        print(f"Skipped {skipped} unchanged page(s)")
+    if errors:
+        print(f"\n❌ {len(errors)} page(s) failed:")
+        for page_key, error in errors:
+            print(f"  - {page_key} ({paths[page_key]}): {error}")
+    return errors
+
+def worker_context():
+    """Start page workers from a fork server (spawn where there is none) instead of forking."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def compile_page_ir(page_details):
+    """Compiled IR of the page a links.json entry generates, or None.
+
+    Pages that fail to compile are reported when they are rendered.
+    """
+    try:
+        return ir_cache.get_or_compile(page_json_path(page_details.get("link", "").strip("/")))
+    except Exception:
+        return None
+
+def pending_scripts(pending):
+    """Script modules of each pending page.
+
+    Pages that fail to compile, or whose sections cannot be inspected (e.g. a
+    missing table file), use none; render_page reports the error for them.
+    """
+    scripts = {}
+    for page_key, path in pending:
+        try:
+            ir = ir_cache.get_or_compile(page_json_path(path))
+            scripts[page_key] = page_scripts(ir.body) if ir else []
+        except Exception:
+            scripts[page_key] = []
+    return scripts
+
+def warn_global_component_sheets():
+    """Point out component sheets that _quarto.yml loads render-blocking on every page."""
+    try:
+        with open("_quarto.yml", "r", encoding="utf-8") as f:
+            quarto_config = yaml.safe_load(f) or {}
+    except OSError:
+        return
+    listed = globally_loaded(quarto_config)
+    if listed:
+        print(
+            "⚠️ _quarto.yml loads these component sheets on every page; generated pages link the ones "
+            "they use and hand-written pages list theirs under css: in their front matter, so they "
+            f"can be dropped from format.html.css: {', '.join(listed)}"
+        )
+
+def refresh_shared_data():
+    """Reload links, icons, groups and tables in place and rebuild the placeholder engine.
+
+    Used by long-running callers (build_all.py --watch) after the shared JSON changes.
+    """
+    global placeholder_engine
+    load_links.reload()
+    placeholder_engine = PlaceholderEngine(link_map)
+
+def replace_placeholders(content, source=None):
+    """Substitute {{{key}}} placeholders in one pass and warn about unknown keys."""
+    return "".join(stream_placeholders([content], source=source))
+
+def stream_placeholders(chunks, source=None):
+    """Yield chunks with placeholders substituted; warns about unknown keys once exhausted."""
+    used = set()
+    unknown = set()
+    yield from profile_transform(
+        "step",
+        "placeholders",
+        lambda source: placeholder_engine.substitute_stream(source, used, unknown),
+        chunks,
+    )
+    for key in used | unknown:
+        track("links", key)
+    if unknown:
+        where = f" in {source}" if source else ""
+        names = ", ".join("{{{" + key + "}}}" for key in sorted(unknown))
+        print(f"⚠️ Unknown placeholder(s){where}: {names}")
+
+def generate_site(force=False, jobs=1, critical_css=False, search_index=False):
+    """Generate the pages listed in links.json from the project root; returns pxp_setup's errors.
+
+    Used by the command line and, in-process, by build_all.py. jobs=0 starts
+    one worker per CPU core. Parsed JSON is kept in the on-disk cache.
+    """
+    enable_disk_cache(JSON_CACHE_PATH)
+    page_data = load_json(Path("tools") / "generation" / "_json" / "links.json")
+    errors = pxp_setup(
+        page_data,
+        force=force,
+        jobs=jobs or os.cpu_count() or 1,
+        critical_css=critical_css,
+        search_index=search_index,
+    )
+    save_disk_cache()
+    print("JSON cache: {hits} hits, {disk_hits} disk hits, {misses} misses".format(**cache_stats()))
+    return errors
 
 def main():
-    project_root = find_project_root(set_path=True)
-    page_struct_path = project_root / "tools" / "generation" / "_json" / "links.json"
-    page_data = load_json(page_struct_path)
-    pxp_setup(page_data)
-   
+    parser = argparse.ArgumentParser(description="Generate QMD pages from JSON specs.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate every page, ignoring the build manifest",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (0 = one per CPU core, default: 1)",
+    )
+    parser.add_argument(
+        "--critical-css",
+        action="store_true",
+        help="Inline the component CSS each page uses and load the other component sheets deferred",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Build the sharded client-side index under assets/search for pages with a search section",
+    )
+    args = parser.parse_args()
+
+    find_project_root(set_path=True)
+    errors = generate_site(
+        force=args.force,
+        jobs=args.jobs,
+        critical_css=args.critical_css,
+        search_index=args.search_index,
+    )
+    if errors:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,197 @@
+"""
+images.py
+Responsive image derivatives for the header-block and flipbook renderers.
+
+Derivatives are resized WebP copies of a source image at a few widths,
+written to assets/images/responsive/ and named after the source content
+hash, so an unchanged image is never re-encoded. Pages depend on the index
+entry of each image they show, not on the index file as a whole. Pillow is optional:
+without it pages still get intrinsic width/height attributes (read from
+the PNG/JPEG header) but no srcset.
+"""
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+
+from manifest import track
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGES_DIR = Path("assets") / "images"
+RESPONSIVE_DIR = IMAGES_DIR / "responsive"
+INDEX_PATH = RESPONSIVE_DIR / "index.json"
+INDEX_VERSION = 1
+DERIVATIVE_FORMAT = "webp"
+DERIVATIVE_QUALITY = 80
+# Candidate widths; widths at or above the source width are skipped
+WIDTHS = (240, 480, 960, 1440)
+SOURCE_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+# -----------------------
+# Image headers
+# -----------------------
+def png_size(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    return None
+
+def jpeg_size(f):
+    """Scan JPEG markers up to the first start-of-frame segment."""
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def image_size(path):
+    """Return (width, height) of a PNG or JPEG without decoding it, or None."""
+    with open(path, "rb") as f:
+        size = png_size(f.read(24))
+        if size:
+            return size
+        f.seek(0)
+        return jpeg_size(f)
+
+# -----------------------
+# Derivatives
+# -----------------------
+def source_path(src):
+    """Map a site-absolute image URL to its file, or None for external/unsupported images."""
+    if not src.startswith("/") or Path(src).suffix.lower() not in SOURCE_SUFFIXES:
+        return None
+    path = Path(src.lstrip("/"))
+    return path if path.exists() else None
+
+def derivative_name(path, digest, width):
+    return f"{path.stem}-{digest[:10]}-{width}w.{DERIVATIVE_FORMAT}"
+
+def write_derivative(path, destination, width):
+    """Resize path to width and save it atomically (safe with concurrent page workers)."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = destination.with_name(f"{destination.name}.{os.getpid()}.tmp")
+    with Image.open(path) as img:
+        height = round(img.height * width / img.width)
+        img.resize((width, height), Image.LANCZOS).save(
+            tmp_path, DERIVATIVE_FORMAT.upper(), quality=DERIVATIVE_QUALITY
+        )
+    os.replace(tmp_path, destination)
+
+def describe_image(path, digest):
+    """Return the index entry for a source image, creating missing derivatives."""
+    size = image_size(path)
+    entry = {"sha256": digest, "width": None, "height": None, "derivatives": {}}
+    if size:
+        entry["width"], entry["height"] = size
+    if Image is None or not size:
+        return entry
+    for width in WIDTHS:
+        if width >= size[0]:
+            break
+        destination = RESPONSIVE_DIR / derivative_name(path, digest, width)
+        if not destination.exists():
+            write_derivative(path, destination, width)
+        entry["derivatives"][str(width)] = "/" + destination.as_posix()
+    return entry
+
+class ImageIndex:
+    """Source image URL -> size and derivatives, validated by mtime and size."""
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.images = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("pillow") == (Image is not None):
+                self.images = data.get("images", {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, src):
+        path = source_path(src)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        entry = self.images.get(src)
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, **describe_image(path, digest)}
+        self.images[src] = entry
+        return entry
+
+    def save(self):
+        """Write the index if it changed and delete derivatives no entry refers to.
+
+        Returns True if the index file was written.
+        """
+        used = {Path(url).name for entry in self.images.values() for url in entry["derivatives"].values()}
+        for derivative in RESPONSIVE_DIR.glob(f"*.{DERIVATIVE_FORMAT}"):
+            if derivative.name not in used:
+                derivative.unlink()
+        content = json.dumps(
+            {"version": INDEX_VERSION, "pillow": Image is not None, "images": self.images},
+            indent=1, sort_keys=True,
+        )
+        if self.path.exists() and self.path.read_text(encoding="utf-8") == content:
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(content, encoding="utf-8")
+        return True
+
+_index = None
+
+def current_index():
+    """The index pages are rendered against, loaded once per process."""
+    global _index
+    if _index is None:
+        _index = ImageIndex()
+    return _index
+
+def responsive_image(src):
+    """Return {"width", "height", "srcset"} for a site image (srcset may be ""), or None."""
+    if source_path(src) is None:
+        return None
+    # The entry records the source's size, mtime and hash, so it also covers source edits
+    track("images", src)
+    entry = current_index().lookup(src)
+    srcset = ", ".join(f"{url} {width}w" for width, url in sorted(
+        entry["derivatives"].items(), key=lambda item: int(item[0])
+    ))
+    if srcset and entry["width"]:
+        srcset += f", {src} {entry['width']}w"
+    return {"width": entry["width"], "height": entry["height"], "srcset": srcset}
+
+def refresh_index(images_dir=IMAGES_DIR):
+    """Index every source image under images_dir, create its derivatives and save the index.
+
+    Called once per generation run, before any page renders. Unchanged
+    images are only stat'ed. Returns the index, which also becomes the one
+    this process renders against.
+    """
+    global _index
+    index = ImageIndex()
+    sources = [
+        p for p in sorted(Path(images_dir).rglob("*"))
+        if p.suffix.lower() in SOURCE_SUFFIXES and RESPONSIVE_DIR not in p.parents
+    ]
+    for path in sources:
+        index.lookup("/" + path.as_posix())
+    index.images = {src: entry for src, entry in index.images.items() if source_path(src)}
+    if index.save():
+        derivatives = sum(len(entry["derivatives"]) for entry in index.images.values())
+        note = "" if Image is not None else " (Pillow not installed: sizes only, no derivatives)"
+        print(f"🖼️ Indexed {len(index.images)} images, {derivatives} derivatives{note}")
+    _index = index
+    return index
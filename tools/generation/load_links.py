@@ -1,19 +1,36 @@
-from mypyutils import (
-    find_project_root, 
-    load_json
-) 
+import sys
+from pathlib import Path
+
+# tools/ holds modules shared with the CSS pipeline (json_cache)
+tools_dir = str(Path(__file__).resolve().parents[1])
+if tools_dir not in sys.path:
+    sys.path.insert(0, tools_dir)
+
+from mypyutils import find_project_root
+from json_cache import load_json
+from manifest import TrackedMap
 
 project_root = find_project_root(set_path=True)
 links_path = project_root / "tools" / "generation" / "_json" / "links.json"
+icons_path = project_root / "tools" / "generation" / "_json" / "icons.json"
+groups_path = project_root / "tools" / "generation" / "_json" / "groups.json"
+tables_path = project_root / "tools" / "generation" / "_json" / "tables.json"
 
-link_map = load_json(links_path)
+link_map = TrackedMap("links")
+groups = TrackedMap("groups")
+tables = TrackedMap("tables")
 
-icons_path = project_root / "tools" / "generation" / "_json" / "icons.json"
-branded_text = load_json(icons_path)
-link_map.update(branded_text)
+def reload():
+    """(Re)load the shared link data in place, so modules that imported the maps see the update."""
+    link_map.clear()
+    link_map.update(load_json(links_path))
+    branded_text = load_json(icons_path)
+    link_map.update(branded_text)
 
-groups_path = project_root / "tools" / "generation" / "_json" / "groups.json"
-groups = load_json(groups_path)
+    groups.clear()
+    groups.update(load_json(groups_path))
 
-tables_path = project_root / "tools" / "generation" / "_json" / "tables.json"
-tables = load_json(tables_path)
\ No newline at end of file
+    tables.clear()
+    tables.update(load_json(tables_path))
+
+reload()
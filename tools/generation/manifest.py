@@ -0,0 +1,199 @@
+"""
+manifest.py
+Content-hash build manifest used to regenerate only the pages whose inputs changed.
+"""
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+MANIFEST_VERSION = 2
+
+# -----------------------
+# Dependency tracking
+# -----------------------
+_active_deps = None
+
+def track(kind, key):
+    """Record that the page currently being rendered read `key` from `kind`."""
+    if _active_deps is not None:
+        _active_deps.add((kind, str(key)))
+
+def track_file(path):
+    """Record that the page currently being rendered read the file at `path`."""
+    track("file", path)
+
+@contextmanager
+def recording():
+    """Collect every dependency touched inside the block into a set of (kind, key) pairs."""
+    global _active_deps
+    previous = _active_deps
+    _active_deps = set()
+    try:
+        yield _active_deps
+    finally:
+        # Nested recordings also count towards the enclosing one
+        if previous is not None:
+            previous |= _active_deps
+        _active_deps = previous
+
+class TrackedMap(dict):
+    """Dictionary that reports key lookups to the active dependency recorder."""
+    def __init__(self, kind, data=None):
+        super().__init__(data or {})
+        self.kind = kind
+
+    def get(self, key, default=None):
+        track(self.kind, key)
+        return super().get(key, default)
+
+    def __getitem__(self, key):
+        track(self.kind, key)
+        return super().__getitem__(key)
+
+# -----------------------
+# Hashing
+# -----------------------
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_value(value):
+    """Stable hash of a JSON-serialisable value, or None if the value is missing."""
+    if value is None:
+        return None
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hash_bytes(encoded)
+
+def toolchain_hash(source_dir, shared_sources=()):
+    """Hash of the generator sources, so a renderer change invalidates every page.
+
+    `shared_sources` lists modules outside source_dir the generator imports.
+    """
+    digest = hashlib.sha256()
+    for source in [*sorted(Path(source_dir).glob("*.py")), *map(Path, shared_sources)]:
+        digest.update(source.name.encode("utf-8"))
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+# -----------------------
+# Manifest
+# -----------------------
+class BuildManifest:
+    """Per-page record of input hashes from the previous generation run.
+
+    `shared` maps a dependency kind ("links", "groups", "tables") to the
+    dictionary its entries are looked up in. File hashes are cached by
+    mtime and size so unchanged files are not re-read.
+    """
+    def __init__(self, path, shared, toolchain):
+        self.path = Path(path)
+        self.shared = shared
+        self.toolchain = toolchain
+        self._hashes = {}
+        self._dirty = False
+        data = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        if data.get("version") != MANIFEST_VERSION or data.get("toolchain") != toolchain:
+            data = {}
+            self._dirty = True
+        self.files = data.get("files", {})
+        self.pages = data.get("pages", {})
+
+    def file_hash(self, path):
+        path = str(path)
+        if path in self._hashes:
+            return self._hashes[path]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._dirty |= self.files.pop(path, None) is not None
+            self._hashes[path] = None
+            return None
+        cached = self.files.get(path)
+        if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            digest = cached["sha256"]
+        else:
+            with open(path, "rb") as f:
+                digest = hash_bytes(f.read())
+            self.files[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+            self._dirty = True
+        self._hashes[path] = digest
+        return digest
+
+    def dep_hash(self, kind, key):
+        if kind == "file":
+            return self.file_hash(key)
+        # Shared entries are looked up by many pages; each one is hashed once per run
+        if (kind, key) not in self._hashes:
+            source = self.shared.get(kind, {})
+            # dict.get bypasses TrackedMap so hashing does not register as a page dependency
+            self._hashes[kind, key] = hash_value(dict.get(source, key))
+        return self._hashes[kind, key]
+
+    def forget(self, kind, key):
+        """Drop the memoised hash of a shared entry that changed during the run."""
+        self._hashes.pop((kind, key), None)
+
+    def is_stale(self, page_key, output_path):
+        """Return True if the page has to be regenerated."""
+        entry = self.pages.get(page_key)
+        if not entry or entry.get("output") != str(output_path):
+            return True
+        if entry.get("output_hash") and self.file_hash(output_path) != entry["output_hash"]:
+            return True
+        for kind, hashes in entry.get("deps", {}).items():
+            for key, digest in hashes.items():
+                if self.dep_hash(kind, key) != digest:
+                    return True
+        return False
+
+    def scripts(self, page_key):
+        """Script modules the page used when it was last generated."""
+        return self.pages.get(page_key, {}).get("scripts", [])
+
+    def record(self, page_key, output_path, deps, scripts=()):
+        """Store the current hashes of everything the page touched and the scripts it uses."""
+        self._hashes.pop(str(output_path), None)
+        written = os.path.exists(output_path)
+        dep_hashes = {}
+        for kind, key in sorted(deps):
+            dep_hashes.setdefault(kind, {})[key] = self.dep_hash(kind, key)
+        self.pages[page_key] = {
+            "output": str(output_path),
+            "output_hash": self.file_hash(output_path) if written else None,
+            "deps": dep_hashes,
+            "scripts": list(scripts),
+        }
+        self._dirty = True
+
+    def tracked_files(self):
+        """Every file a page read when it was last generated."""
+        return {path for entry in self.pages.values() for path in entry.get("deps", {}).get("file", {})}
+
+    def save(self, page_keys=None):
+        """Write the manifest if anything changed, dropping pages that are no longer generated."""
+        if page_keys is not None and not self.pages.keys() <= set(page_keys):
+            self.pages = {k: v for k, v in self.pages.items() if k in page_keys}
+            self._dirty = True
+        if not self._dirty:
+            return
+        used = self.tracked_files() | {entry["output"] for entry in self.pages.values()}
+        self.files = {k: v for k, v in self.files.items() if k in used}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # json.dumps without indent runs on the C encoder; json.dump and indent do not
+            f.write(json.dumps({
+                "version": MANIFEST_VERSION,
+                "toolchain": self.toolchain,
+                "files": self.files,
+                "pages": self.pages,
+            }, sort_keys=True, separators=(",", ":")))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,199 @@
+"""
+page_ir.py
+Compile page JSON into a resolved, immutable intermediate representation.
+
+Compilation inlines json-path sections, FAQ items (items_path) and flipbook
+image data (img-json-path) and expands page-groups into explicit link lists.
+Renderers then work from the frozen result without touching the filesystem or mutating shared data.
+"""
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+from pathlib import Path
+
+from load_links import groups
+from manifest import recording, track, track_file
+from json_cache import load_json
+
+IR_VERSION = 2
+
+PageIR = namedtuple("PageIR", ["meta", "body"])
+
+# -----------------------
+# Frozen containers
+# -----------------------
+class FrozenDict(dict):
+    """Read-only dictionary used for IR nodes."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("page IR is immutable")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+def freeze(value):
+    """Recursively convert dicts to FrozenDict and lists to tuples."""
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Convert frozen IR values back to plain dicts and lists (e.g. for YAML output)."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+# -----------------------
+# Compilation
+# -----------------------
+def expand_groups(links, page_groups):
+    expanded = list(links)
+    for pg in page_groups:
+        expanded += groups.get(pg, [])
+    return expanded
+
+def compile_section(item, visited=frozenset()):
+    """Return a plain-dict copy of a section with every external reference resolved.
+
+    A json-path is merged into the section (the file's keys win) and, if the
+    merged file itself has a json-path, that one is followed too, until the
+    chain ends. The original renderer only merged the first file. A path seen
+    earlier in the chain, or in an enclosing panel-tabset, yields a section
+    with only a "skip-reason".
+    """
+    item = dict(item)
+
+    while "json-path" in item:
+        path = item.pop("json-path")
+        if path in visited:
+            return {"skip-reason": f"circular reference: {path}"}
+        visited = visited | {path}
+        track_file(path)
+        nested_data = load_json(path, missing_ok=True)
+        if nested_data is not None:
+            item.update(nested_data)
+
+    section_type = item.get("type")
+    if section_type == "faqs" and "items_path" in item:
+        track_file(item["items_path"])
+        item["faq-items"] = load_json(item["items_path"])
+    elif section_type == "flipbook" and "img-json-path" in item:
+        track_file(item["img-json-path"])
+        item["image-data"] = load_json(item["img-json-path"])
+    elif section_type == "quick-links":
+        item["page-list"] = expand_groups(item.get("page-list", []), item.pop("page-groups", []))
+    elif section_type == "category-grid" and "quick-links" in item:
+        item["quick-links"] = [
+            {
+                **{k: v for k, v in ql.items() if k != "page-groups"},
+                "links-list": expand_groups(ql.get("links-list", []), ql.get("page-groups", [])),
+            }
+            for ql in item["quick-links"]
+        ]
+    elif section_type == "panel-tabset":
+        item["tabs"] = [
+            {**tab, "sections": [compile_section(s, visited) for s in tab.get("sections", [])]}
+            for tab in item.get("tabs", [])
+        ]
+    return item
+
+def compile_page(json_data):
+    """Compile a page's JSON spec into a frozen PageIR."""
+    body = [compile_section(item) for item in json_data.get("body", [])]
+    return PageIR(meta=freeze(json_data.get("meta", {})), body=freeze(body))
+
+def iter_sections(body):
+    """Yield every section in the body, including nested tab sections."""
+    for item in body:
+        yield item
+        for tab in item.get("tabs", ()):
+            yield from iter_sections(tab.get("sections", ()))
+
+def iter_section_types(body):
+    """Yield the type of every section in the body, including nested tab sections."""
+    return (item.get("type") for item in iter_sections(body))
+
+# -----------------------
+# On-disk IR cache
+# -----------------------
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def group_signature(name):
+    # dict.get bypasses the TrackedMap so validation is not recorded as a dependency
+    return dict.get(groups, name)
+
+class IRCache:
+    """Pickled PageIR per page JSON, valid while every file and group it used is unchanged.
+
+    `toolchain` is the generator source hash (manifest.toolchain_hash); entries
+    compiled by other generator code are discarded.
+    """
+    def __init__(self, cache_dir, toolchain):
+        self.cache_dir = Path(cache_dir)
+        self.toolchain = toolchain
+
+    def _entry_path(self, json_path):
+        digest = hashlib.sha1(str(json_path).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.pickle"
+
+    def load(self, json_path):
+        """Return the cached IR, replaying its dependencies, or None if stale or missing."""
+        try:
+            with open(self._entry_path(json_path), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, ValueError):
+            return None
+        if entry.get("version") != IR_VERSION or entry.get("toolchain") != self.toolchain:
+            return None
+        for path, signature in entry["files"].items():
+            if file_signature(path) != signature:
+                return None
+        for name, value in entry["groups"].items():
+            if group_signature(name) != value:
+                return None
+        for path in entry["files"]:
+            track_file(path)
+        for name in entry["groups"]:
+            track("groups", name)
+        return entry["ir"]
+
+    def store(self, json_path, ir, deps):
+        entry = {
+            "version": IR_VERSION,
+            "toolchain": self.toolchain,
+            "files": {key: file_signature(key) for kind, key in deps if kind == "file"},
+            "groups": {key: group_signature(key) for kind, key in deps if kind == "groups"},
+            "ir": ir,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(json_path)
+        tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+    def get_or_compile(self, json_path):
+        """Load the page IR from cache, or compile the page JSON and cache the result."""
+        ir = self.load(json_path)
+        if ir is not None:
+            return ir
+        with recording() as deps:
+            track_file(json_path)
+            json_data = load_json(json_path, missing_ok=True)
+            if not json_data:
+                return None
+            ir = compile_page(json_data)
+        self.store(json_path, ir, deps)
+        return ir
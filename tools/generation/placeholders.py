@@ -0,0 +1,55 @@
+"""
+placeholders.py
+Single-pass substitution of {{{key}}} placeholders.
+"""
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\{([^{}\n]*)\}\}\}")
+# Trailing text that could still become a placeholder once the next chunk arrives
+PARTIAL_PATTERN = re.compile(r"\{{1,3}[^{}\n]*\}{0,2}$")
+
+class PlaceholderEngine:
+    """Replace {{{key}}} tokens with link_map[key]["link"] in one scan of the content.
+
+    The lookup table is built once from the link map, so the cost of a
+    substitution depends on the size of the page, not on the number of keys.
+    Unknown placeholders are left in place and reported back to the caller.
+    """
+    def __init__(self, link_map):
+        # dict.items avoids recording every key as a page dependency
+        self.links = {key: value.get('link', "") for key, value in dict.items(link_map)}
+
+    def _replace(self, text, used, unknown):
+        def lookup(match):
+            key = match.group(1)
+            link = self.links.get(key)
+            if link is None:
+                unknown.add(key)
+                return match.group(0)
+            used.add(key)
+            return link
+
+        return PLACEHOLDER_PATTERN.sub(lookup, text)
+
+    def substitute(self, content):
+        """Return (content, used_keys, unknown_keys) for a single page."""
+        used = set()
+        unknown = set()
+        return self._replace(content, used, unknown), used, unknown
+
+    def substitute_stream(self, chunks, used, unknown):
+        """Yield substituted chunks, adding seen keys to the `used` and `unknown` sets.
+
+        A placeholder split across chunk boundaries is held back until it is
+        complete, so the output is identical to substituting the joined text.
+        """
+        pending = ""
+        for chunk in chunks:
+            pending += chunk
+            partial = PARTIAL_PATTERN.search(pending)
+            cut = partial.start() if partial else len(pending)
+            if cut:
+                yield self._replace(pending[:cut], used, unknown)
+                pending = pending[cut:]
+        if pending:
+            yield self._replace(pending, used, unknown)
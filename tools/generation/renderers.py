@@ -1,114 +1,144 @@
+import hashlib
 import json
 import os
+import re
+from itertools import chain
+from pathlib import Path
 
-from scripts import (
-    script_flipbook, 
-    script_toggle_all,
-    enable_thebe_script
-)
-from load_links import link_map, groups, tables
-
-from mypyutils import (
-    load_json
-)
+from images import responsive_image
+from load_links import link_map, tables
+from manifest import track_file
+from page_ir import compile_section
+from profiling import profiled_generator_function
+from table_sources import PAGE_SIZE, iter_large_table, section_source, split_large, table_rows
 
 # -----------------------
 # Registry setup
 # -----------------------
-RENDERERS = {}
+FLIPBOOK_DIR = Path("assets") / "flipbooks"
 
-def register_renderer(section_type):
-    """Decorator to register a renderer for a specific section type."""
+RENDERERS = {}
+# Component stylesheets (in assets/css) each section type needs; layout sheets
+# _quarto.yml loads on every page (headers.css, tab-cards.css) are not listed
+RENDERER_SHEETS = {}
+# Script modules (scripts.SCRIPT_MODULES) each section type needs, or a function
+# of the section returning them when only some sections of the type need them
+RENDERER_SCRIPTS = {}
+
+def register_renderer(section_type, sheets=(), scripts=()):
+    """Decorator to register a renderer for a specific section type.
+
+    Renderers are generators: they yield chunks of QMD content in order
+    instead of building the whole section as one string. `sheets` names the
+    component stylesheets the rendered markup relies on and `scripts` the
+    script modules it calls (or a function of the section returning them);
+    pages load those from the shared script bundle.
+    """
     def decorator(func):
-        RENDERERS[section_type] = func
+        # The registry entry is profiled when build_all.py --profile is active
+        RENDERERS[section_type] = profiled_generator_function("renderer", section_type, func)
+        RENDERER_SHEETS[section_type] = tuple(sheets)
+        RENDERER_SCRIPTS[section_type] = scripts if callable(scripts) else tuple(scripts)
         return func
     return decorator
 
+def section_scripts(item):
+    """Script modules a section needs."""
+    scripts = RENDERER_SCRIPTS.get(item.get("type"), ())
+    return scripts(item) if callable(scripts) else scripts
+
 # -----------------------
 # Renderers
 # -----------------------
 @register_renderer("header")
 def render_header(item):
     level = item.get("level", 2)
-    return f"\n{'#' * level} {item['text']}\n"
+    yield f"\n{'#' * level} {item['text']}\n"
 
 @register_renderer("text")
 def render_text(item):
-    return f"\n{item['markdown']}\n"
+    yield f"\n{item['markdown']}\n"
 
 @register_renderer("header-block")
 def render_header_block(item):
     img = item.get("img", "")
     name = item.get("h1", "")
     subtitle = item.get("h2", "")
-    html = '\n::: {.header-block}\n\n'
-    html += '![](' + img + '){.img}\n\n'
-    html += f'## {name}\n'
-    html += f'### {subtitle}\n'
-    html += ":::\n\n"
-    return html
-
-@register_renderer("custom-callout")
+    # Displayed width for srcset selection; headers.css shows the image at 120px
+    sizes = item.get("img-sizes", "120px")
+    yield '\n::: {.header-block}\n\n'
+    yield '![](' + img + '){.img' + image_attributes(img, sizes=sizes) + '}\n\n'
+    yield f'## {name}\n'
+    yield f'### {subtitle}\n'
+    yield ":::\n\n"
+
+def image_attributes(src, sizes, lazy=False):
+    """Pandoc attributes for intrinsic size, responsive srcset and lazy loading."""
+    attrs = ' loading="lazy"' if lazy else ""
+    info = responsive_image(src)
+    if not info or not info["width"]:
+        return attrs
+    attrs += f' width="{info["width"]}" height="{info["height"]}"'
+    if info["srcset"]:
+        attrs += f' srcset="{info["srcset"]}" sizes="{sizes}"'
+    return attrs
+
+@register_renderer("custom-callout", sheets=["custom-callouts.css"])
 def render_custom_callout(item):
     callout_type = item.get("callout-type", "")
     title = item.get("title", "")
     text = item.get("text", "")
-    html = '\n::: {.callout icon="none" .custom-callout .'
-    html += f'{callout_type} title="{title}"'
-    html += '}\n\n' 
-    html += f'{text}\n'
-    html += ":::\n\n"
-    return html
+    yield '\n::: {.callout icon="none" .custom-callout .'
+    yield f'{callout_type} title="{title}"'
+    yield '}\n\n'
+    yield f'{text}\n'
+    yield ":::\n\n"
 
 @register_renderer("code")
 def render_code(item):
     language = item.get("language", "python")
     content = item["content"]
-    html = "```{" + language + "}\n"
-    html += content + '\n'
-    html += "```\n"
-    return html
+    yield "```{" + language + "}\n"
+    yield content + '\n'
+    yield "```\n"
 
-@register_renderer("category-grid")
+@register_renderer("category-grid", sheets=["category-grid.css", "quick-links.css"])
 def render_category_grid(item):
-    html = '\n<div class="category-grid">\n'
+    yield '\n<div class="category-grid">\n'
 
     # Case 1: Standard categories
     if "categories" in item:
         for category in item["categories"]:
-            html += '<div class="category-card">\n'
-            html += f"<h3>{category['title']}</h3>\n"
+            yield '<div class="category-card">\n'
+            yield f"<h3>{category['title']}</h3>\n"
             if category.get("items"):
-                html += "<ul>\n"
+                yield "<ul>\n"
                 for i in category["items"]:
-                    html += f"<li>{i}</li>\n"
-                html += "</ul>\n"
-            html += "</div>\n"
+                    yield f"<li>{i}</li>\n"
+                yield "</ul>\n"
+            yield "</div>\n"
 
     # Case 2: Commands
     elif "commands" in item:
         for cmd in item["commands"]:
-            html += '<div class="category-card">\n'
-            html += f"<h3>{cmd['name']}</h3>\n"
-            html += f"<p>{cmd['description']}</p>\n"
+            yield '<div class="category-card">\n'
+            yield f"<h3>{cmd['name']}</h3>\n"
+            yield f"<p>{cmd['description']}</p>\n"
             if cmd.get("flags"):
-                html += "<ul>\n"
+                yield "<ul>\n"
                 for flag in cmd["flags"]:
-                    html += f"<li><code>{flag['flag']}</code>: {flag['description']}</li>\n"
-                html += "</ul>\n"
-            html += "</div>\n"
+                    yield f"<li><code>{flag['flag']}</code>: {flag['description']}</li>\n"
+                yield "</ul>\n"
+            yield "</div>\n"
 
     elif "quick-links" in item:
         for ql in item['quick-links']:
             title = ql["title"]
+            # page_ir has already expanded the page-groups into links-list
             page_links = ql.get("links-list", [])
-            page_groups = ql.get("page-groups", [])
-            for pg in page_groups:
-                group_links = groups.get(pg, [])
-                page_links += group_links
-            html += '<div class="category-card">\n'
-            html += f"<h3>{title}</h3>\n"
-            html += f"<div class=\"quick-links\">"
+            yield '<div class="category-card">\n'
+            yield f"<h3>{title}</h3>\n"
+            yield f"<div class=\"quick-links\">"
             for page_link in page_links:
                 link_data = link_map.get(page_link)
                 if link_data:
@@ -116,129 +146,144 @@ def render_category_grid(item):
                     icon = link_data["icon"]
                     href = link_data["link"]
                     desc = link_data["description"]
-                    html += (
+                    yield (
                         f'<div class="quick-link-item">'
                         f'<i class="fa-regular fa-{icon}"></i> '
                         f'<strong><a href="{href}">{label}</a></strong> → {desc}'
                         f'</div>'
                     )
-            html += ("</div></div>")
+            yield ("</div></div>")
 
     elif "text_categories" in item:
         for category in item["text_categories"]:
-            html += '<div class="category-card">\n'
-            html += f"<h3>{category['title']}</h3>\n"
-            html += category.get("text", "")
-            html += "</div>\n"
+            yield '<div class="category-card">\n'
+            yield f"<h3>{category['title']}</h3>\n"
+            yield category.get("text", "")
+            yield "</div>\n"
 
-    html += "</div>\n"
-    return html
+    yield "</div>\n"
 
 @register_renderer("panel-tabset")
 def render_panel_tabset(item):
-    output = "\n::: {.panel-tabset}\n\n"
+    yield "\n::: {.panel-tabset}\n\n"
     tabs = item.get("tabs", [])
     for tab in tabs:
-        output += f"## {tab['title']}\n"
+        yield f"## {tab['title']}\n"
         for section in tab.get("sections", []):
-            output += write_section(section)
-    output += ":::\n"
-    return output
+            yield from write_section(section)
+    yield ":::\n"
 
 @register_renderer("collapsible")
 def render_collapsible(item):
     css_class = item.get("class", "")
-    html = f'<details class="{css_class}">\n'
-    html += f"<summary>{item['summary']}</summary>\n"
+    yield f'<details class="{css_class}">\n'
+    yield f"<summary>{item['summary']}</summary>\n"
     if item.get("content"):
-        html += f"{item['content']}\n\n"
+        yield f"{item['content']}\n\n"
     if item.get("code"):
         language = item.get("language", "python")
-        html += f"\n```{language}\n{item['code']}\n```\n"
-    html += "</details>\n\n"
-    return html
+        yield f"\n```{language}\n{item['code']}\n```\n"
+    yield "</details>\n\n"
 
 @register_renderer("static-tab")
 def render_static_tab(item):
     css_class = item.get("class", "tab-card static-tab")
-    html = f'<div class="{css_class}">\n'
+    yield f'<div class="{css_class}">\n'
     if item.get("content"):
-        html += f"{item['content']}\n\n"
+        yield f"{item['content']}\n\n"
     if item.get("code"):
-        html += f"```python\n{item['code']}\n```\n"
-    html += "</div>\n\n"
-    return html
+        yield f"```python\n{item['code']}\n```\n"
+    yield "</div>\n\n"
 
-@register_renderer("faqs")
+@register_renderer("faqs", sheets=["faqs.css"])
 def render_faqs(item):
-    html = ""
-    q_data = load_json(item['items_path'])
-    for q in q_data:
-        html += f'<h3 id=\"{q["question"]}\" class=\"visually-hidden\">{q["question"]}</h3>\n'
-        html += f"""<details>\n<summary class=\"faq-summary\">{q['question']}</summary>\n\n{q['answer']}\n\n</details>\n\n"""
-    return html
-
-@register_renderer("toggle-all")
+    for q in item["faq-items"]:
+        yield f'<h3 id=\"{q["question"]}\" class=\"visually-hidden\">{q["question"]}</h3>\n'
+        yield f"""<details>\n<summary class=\"faq-summary\">{q['question']}</summary>\n\n{q['answer']}\n\n</details>\n\n"""
+
+@register_renderer("toggle-all", sheets=["buttons.css"], scripts=["toggle-all"])
 def render_toggle_all(item):
-    html = f"\n<button class=\"toggle-all-button\" onclick=\"toggleAll()\">{item['text']}</button>\n\n"
-    html += script_toggle_all +'\n\n'
-    return html
+    yield f"\n<button class=\"toggle-all-button\" onclick=\"toggleAll()\">{item['text']}</button>\n\n"
 
 
-@register_renderer("enable-thebe")
+@register_renderer("enable-thebe", sheets=["buttons.css"], scripts=["enable-thebe"])
 def render_enable_thebe(item):
-    html = '<div id="thebe-wrapper" style="margin: 1em 0;">\n'
-    html += '  <button id="enable-thebe" class="toggle-thebe-btn">🔁 Enable Interactivity</button>\n'
-    html += '  <span id="thebe-status" style="margin-left: 1em; font-weight: bold; color: #555;">\n'
-    html += '    Thebe: Not activated\n'
-    html += '  </span>\n'
-    html += '</div>\n\n'
-    html += enable_thebe_script +'\n\n'
-    return html
+    yield '<div id="thebe-wrapper" style="margin: 1em 0;">\n'
+    yield '  <button id="enable-thebe" class="toggle-thebe-btn">🔁 Enable Interactivity</button>\n'
+    yield '  <span id="thebe-status" style="margin-left: 1em; font-weight: bold; color: #555;">\n'
+    yield '    Thebe: Not activated\n'
+    yield '  </span>\n'
+    yield '</div>\n\n'
+
+
+@register_renderer("search", scripts=["search"])
+def render_search(item):
+    placeholder = item.get("placeholder", "Search the site")
+    yield '\n<div class="pxp-search" data-search>\n'
+    yield f'  <input type="search" class="pxp-search-input" placeholder="{placeholder}" aria-label="{placeholder}">\n'
+    yield '  <ol class="pxp-search-results" aria-live="polite"></ol>\n'
+    yield '</div>\n\n'
 
 
 @register_renderer("page-quote")
 def render_category_grid(item):
-    html = '\n<div class="page-quote">\n'
-    html+= f"{item['text']}\n"
-    html += "</div>\n\n"
-    return html
+    yield '\n<div class="page-quote">\n'
+    yield f"{item['text']}\n"
+    yield "</div>\n\n"
 
 @register_renderer("divider")
 def render_category_grid(item):
-    html = '\n<hr class="page-divider">\n'
-    return html
+    yield '\n<hr class="page-divider">\n'
 
-@register_renderer("flipbook")
+@register_renderer("flipbook", sheets=["flipbook.css"], scripts=["flipbook"])
 def render_flipbook(item):
-    image_data = load_json(item['img-json-path'])
-    html = "\n```{=html}\n"
-    html += "<script>\n"
-    html += "const flipData = [\n"
-    image_list = []
+    manifest_url = write_flipbook_manifest(item, item["image-data"])
+    # Slides are fetched from the manifest when the flipbook scrolls into view
+    yield "\n```{=html}\n"
+    yield f'<div class="flipbook-mount" data-flipbook="{manifest_url}">\n'
+    yield "{{< include /assets/html/flipbook.html >}}\n"
+    yield "</div>\n```\n\n"
+
+def write_flipbook_manifest(item, image_data):
+    """Write the slide list (with image sizes and srcsets) as JSON; returns its versioned URL."""
+    slides = []
     for img in image_data['images']:
-        line = '  {{ src: "{src}", caption: "{caption}" }}'.format(
-            src=img["src"],
-            caption=img["caption"]
-        )
-        image_list.append(line)
-    flip_data = (',\n'.join(image_list))
-    html += flip_data
-    html += '\n];\n</script>\n```\n\n\n'
-    html += "```{=html}\n{{< include /assets/html/flipbook.html >}}\n```\n\n"
-    html += script_flipbook +'\n\n'
-    return html
-
-@register_renderer("quick-links")
+        slide = {"src": img["src"], "caption": img.get("caption", ""), "title": img.get("title", "")}
+        info = responsive_image(img["src"])
+        if info and info["width"]:
+            slide.update(info)
+        slides.append(slide)
+    content = json.dumps({"images": slides}, indent=1, ensure_ascii=False) + "\n"
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:10]
+    # Named after the whole source path: same-named slide lists in different folders stay apart
+    source = Path(item.get("img-json-path", "")).with_suffix("").as_posix().strip("./")
+    name = re.sub(r"[^a-z0-9]+", "-", source.lower()).strip("-") or f"flipbook-{digest}"
+    path = FLIPBOOK_DIR / f"{name}.json"
+
+    if not path.exists() or path.read_text(encoding="utf-8") != content:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Pages render in parallel workers; replace atomically
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+    track_file(str(path))
+    return f"/{path.as_posix()}?v={digest}"
+
+def remove_stale_flipbooks(tracked_files):
+    """Delete slide lists no page tracks any more."""
+    used = {Path(path) for path in tracked_files}
+    for path in FLIPBOOK_DIR.glob("*.json"):
+        if path not in used:
+            path.unlink()
+            print(f"🧹 Removed unused flipbook manifest: {path}")
+
+@register_renderer("quick-links", sheets=["quick-links.css"])
 def render_quick_links(item):
     """Render a list of links using icon, label, url, and description from link data."""
+    # page_ir has already expanded the page-groups into page-list
     page_links = item.get("page-list", [])
-    page_groups = item.get("page-groups", [])
-    for pg in page_groups:
-        group_links = groups.get(pg, [])
-        page_links += group_links
 
-    lines = [':::{.quick-links}', '', '<ul>'] 
+    yield ':::{.quick-links}\n\n<ul>\n'
 
     for page_info in page_links:
         page_details = link_map.get(page_info)
@@ -246,68 +291,83 @@ def render_quick_links(item):
             label = page_details.get("label", "")
             url = page_details.get("link", "#")
             icon = page_details.get("icon", "window-maximize")
-            icon_formatted = "{{< fa regular " + icon + " >}}" 
+            icon_formatted = "{{< fa regular " + icon + " >}}"
             description = page_details.get("description", "")
-            line = f'<li class="quick-link-item">{icon_formatted} <strong><a href="{url}">{label}</a></strong> → {description}</li>'
-            lines.append(line)
+            yield f'<li class="quick-link-item">{icon_formatted} <strong><a href="{url}">{label}</a></strong> → {description}</li>\n'
+
+    yield '</ul>\n\n:::\n'  # close ul and block
+
+def section_tables(item):
+    """(name, source) of every table a markdown-table or panel-tabset-tables section shows."""
+    if item.get("type") == "panel-tabset-tables":
+        return [(name, tables.get(name, [])) for name in item.get("table-names", [])]
+    return [(item.get("table-name") or Path(item.get("table-path", "")).stem, section_source(item, tables))]
 
-    lines += ['</ul>', '', ':::']  # close ul and block
-    return "\n".join(lines) + "\n"
+def large_table_scripts(item):
+    """The pager script, for sections with a table past the large-table threshold."""
+    large = any(split_large(table_rows(source))[2] for _, source in section_tables(item))
+    return ("large-table",) if large else ()
 
-@register_renderer("markdown-table")
+@register_renderer("markdown-table", sheets=["tables.css"], scripts=large_table_scripts)
 def render_markdown_table(item):
-    table_dict = tables.get(item['table-name'], {})
-    html = '\n<div class="table-cheatsheet">\n'
-    html += format_markdown_table(table_dict) + "\n\n"
-    html += "</div>\n\n"
-    return html
+    name, source = section_tables(item)[0]
+    yield '\n<div class="table-cheatsheet">\n'
+    yield from iter_table(name, source, item.get("page-size"))
+    yield "\n\n"
+    yield "</div>\n\n"
+
+def iter_table(name, source, page_size=None):
+    """Yield a pipe table, or a paginated HTML table once the source passes the row threshold."""
+    head, rest, large = split_large(table_rows(source))
+    if large:
+        source_id = source["path"] if isinstance(source, dict) else f"tables.json:{name}"
+        yield from iter_large_table(name, source_id, chain(head, rest), page_size or PAGE_SIZE)
+    else:
+        yield from iter_markdown_table(head)
+
+def iter_markdown_table(dict_rows):
+    """Yield a pipe table one line at a time (no trailing newline)."""
+    rows = iter(dict_rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    headers = list(first.keys())
+    yield "| " + " | ".join(headers) + " |"
+    yield "\n| " + " | ".join(["---"] * len(headers)) + " |"
+    for row in chain([first], rows):
+        yield "\n| " + " | ".join(str(row.get(h, "")) for h in headers) + " |"
 
 def format_markdown_table(dict_rows):
-    if not dict_rows:
-        return ""
-    headers = list(dict_rows[0].keys())
-    header_line = "| " + " | ".join(headers) + " |"
-    separator_line = "| " + " | ".join(["---"] * len(headers)) + " |"
-    row_lines = []
-    for row in dict_rows:
-        row_lines.append("| " + " | ".join(str(row.get(h, "")) for h in headers) + " |")
-    return "\n".join([header_line, separator_line] + row_lines)
-
-@register_renderer("panel-tabset-tables")
+    return "".join(iter_markdown_table(dict_rows))
+
+@register_renderer("panel-tabset-tables", sheets=["tables.css"], scripts=large_table_scripts)
 def render_panel_tables(item):
-    output = "\n::: {.panel-tabset}\n\n"
-    tabs = item.get("table-names", [])
-    for tab in tabs:
-        tab_dict = tables.get(tab, {})
-        output += f"#### {tab}\n"
-        output += "::: {.table-cheatsheet}\n"
-        output += format_markdown_table(tab_dict) + "\n"
-        output += ':::\n'
-    output += ":::\n"
-    return output
+    yield "\n::: {.panel-tabset}\n\n"
+    for tab, source in section_tables(item):
+        yield f"#### {tab}\n"
+        yield "::: {.table-cheatsheet}\n"
+        yield from iter_table(tab, source, item.get("page-size"))
+        yield "\n"
+        yield ':::\n'
+    yield ":::\n"
 
 # -----------------------
 # Recursive Rendering Logic
 # -----------------------
-def write_section(item, visited=None):
-    """Render a section item to QMD content. Handles nested JSON paths recursively."""
-    if visited is None:
-        visited = set()
-
-    # Check for json-path and merge nested content
-    if "json-path" in item:
-        path = item["json-path"]
-        if path in visited:
-            return f"\n<!-- Skipping circular reference: {path} -->\n"
-        visited.add(path)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                nested_data = json.load(f)
-            # Merge nested data into current item
-            item.update(nested_data)
+def write_section(item):
+    """Yield the QMD content of a compiled section item (see page_ir.compile_section)."""
+    # Set by page_ir when a json-path chain loops back on itself
+    if "skip-reason" in item:
+        yield f"\n<!-- Skipping {item['skip-reason']} -->\n"
+        return
 
     section_type = item.get("type")
     renderer = RENDERERS.get(section_type)
     if renderer:
-        return renderer(item)
-    return f"\n<!-- Unsupported type: {section_type} -->\n"
\ No newline at end of file
+        yield from renderer(item)
+        return
+    yield f"\n<!-- Unsupported type: {section_type} -->\n"
+
+def render_section(item):
+    """Render a section item from page JSON to a single string."""
+    return "".join(write_section(compile_section(item)))
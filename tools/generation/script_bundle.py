@@ -0,0 +1,64 @@
+"""
+script_bundle.py
+Shared, content-hashed JavaScript bundle for generated pages.
+
+The script modules used by any generated page are concatenated once into
+assets/js/site.<hash>.js. Pages that use a module reference the bundle with
+a deferred <script> tag, so the code is downloaded once and cached across
+pages instead of being pasted inline into each of them.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+from page_ir import iter_sections
+from renderers import section_scripts
+from scripts import SCRIPT_MODULES, inline_script
+
+JS_DIR = Path("assets") / "js"
+
+def page_scripts(body):
+    """Script modules used by a compiled page body, in bundle order."""
+    used = {name for item in iter_sections(body) for name in section_scripts(item)}
+    return [name for name in SCRIPT_MODULES if name in used]
+
+def current_bundle_url():
+    """URL of the bundle written by the previous run, or None."""
+    existing = sorted(JS_DIR.glob("site.*.js"))
+    return f"/{existing[0].as_posix()}" if len(existing) == 1 else None
+
+def build_script_bundle(used):
+    """Write the bundle for the module names in `used`; returns its URL, or None if unused."""
+    used = set(used)
+    modules = [name for name in SCRIPT_MODULES if name in used]
+    stale = set(JS_DIR.glob("site.*.js"))
+    if not modules:
+        for path in stale:
+            path.unlink()
+        return None
+
+    content = "".join(f"/* {name} */\n{SCRIPT_MODULES[name]}\n" for name in modules)
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+    path = JS_DIR / f"site.{digest}.js"
+    stale.discard(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+        print(f"📦 Script bundle: {path} ({', '.join(modules)})")
+    for old in stale:
+        old.unlink()
+    return f"/{path.as_posix()}"
+
+def script_block(body, bundle_url=None):
+    """Raw HTML loading the page's script modules, or "" if it uses none.
+
+    Without a bundle URL (a page rendered on its own) the modules are inlined.
+    """
+    modules = page_scripts(body)
+    if not modules:
+        return ""
+    if bundle_url is None:
+        return "".join(inline_script(SCRIPT_MODULES[name]) + "\n\n" for name in modules)
+    return f'```{{=html}}\n<script src="{bundle_url}" defer></script>\n```\n'
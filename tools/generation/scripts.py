@@ -1,56 +1,111 @@
-script_flipbook = """```{=html}
-<script>
-let current = 0;
+"""
+scripts.py
+Client-side script modules used by the renderers.
 
-function updateFlipbook() {
-  document.getElementById("flip-img").src = flipData[current].src;
-  document.getElementById("flip-caption").textContent = flipData[current].caption;
-}
+Renderers declare the modules they need (register_renderer(..., scripts=[...]));
+script_bundle.py concatenates the modules used across the site into one
+content-hashed file. inline_script() wraps a module for pages rendered
+without a bundle.
+"""
 
-function nextImage() {
-  current = (current + 1) % flipData.length;
-  updateFlipbook();
-}
+flipbook_js = """(function () {
+  // Shared by every flipbook on the page; repeated copies of this script are no-ops
+  if (window.pxpFlipbooks) return;
+  window.pxpFlipbooks = true;
 
-function prevImage() {
-  current = (current - 1 + flipData.length) % flipData.length;
-  updateFlipbook();
-}
+  function preload(book, slide) {
+    if (!slide) return;
+    const img = new Image();
+    if (slide.srcset) {
+      img.sizes = book.img.sizes;
+      img.srcset = slide.srcset;
+    }
+    img.src = slide.src;
+  }
 
-document.addEventListener("DOMContentLoaded", updateFlipbook);
-</script>
-```"""
+  function show(book) {
+    const slides = book.slides;
+    if (!slides.length) return;
+    const slide = slides[book.current];
+    if (slide.width) {
+      book.img.width = slide.width;
+      book.img.height = slide.height;
+    }
+    book.img.srcset = slide.srcset || "";
+    book.img.src = slide.src;
+    book.img.alt = slide.title || slide.caption;
+    book.caption.textContent = slide.caption;
+    // Only the current slide is loaded; its neighbours are warmed for the next click
+    preload(book, slides[(book.current + 1) % slides.length]);
+    preload(book, slides[(book.current - 1 + slides.length) % slides.length]);
+  }
 
-script_toggle_all = """```{=html}
-<script>
-function toggleAll() {
-  const detailsList = document.querySelectorAll("details");
-  const allOpen = Array.from(detailsList).every(d => d.open);
-  detailsList.forEach(d => d.open = !allOpen);
-}
-</script>
-```"""
+  function load(book) {
+    if (!book.loading) {
+      book.loading = fetch(book.el.dataset.flipbook)
+        .then(response => response.json())
+        .then(data => {
+          book.slides = data.images || [];
+          show(book);
+        });
+    }
+    return book.loading;
+  }
 
-script_sidebar_toggle = """```{=html}
-<script>
-  const sidebar = document.getElementById('quarto-sidebar');
-  const toggle = document.getElementById('sidebarToggle');
+  function init(el) {
+    const book = {
+      el: el,
+      img: el.querySelector(".flip-img"),
+      caption: el.querySelector(".flip-caption"),
+      current: 0,
+      slides: [],
+      loading: null
+    };
+    el.querySelectorAll("[data-flip]").forEach(button => {
+      button.addEventListener("click", () => load(book).then(() => {
+        const count = book.slides.length;
+        if (!count) return;
+        book.current = (book.current + Number(button.dataset.flip) + count) % count;
+        show(book);
+      }));
+    });
+    if ("IntersectionObserver" in window) {
+      const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+          observer.disconnect();
+          load(book);
+        }
+      }, { rootMargin: "200px" });
+      observer.observe(el);
+    } else {
+      load(book);
+    }
+  }
 
-  toggle?.addEventListener('click', () => {
-    sidebar.classList.toggle('d-none');
-  });
-</script>
-```"""
+  function initAll() {
+    document.querySelectorAll("[data-flipbook]").forEach(init);
+  }
 
-sidebar_toggle_html = """<button id="sidebarToggle" class="btn btn-sm" aria-label="Toggle sidebar"
-  style="position: fixed; top: 1rem; left: 1rem; z-index: 1050;">
-  <i class="bi bi-layout-sidebar-inset"></i>
-</button>"""
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initAll);
+  } else {
+    initAll();
+  }
+})();
+"""
 
+toggle_all_js = """function toggleAll() {
+  const detailsList = document.querySelectorAll("details");
+  const allOpen = Array.from(detailsList).every(d => d.open);
+  detailsList.forEach(d => d.open = !allOpen);
+}
+"""
 
-enable_thebe_script="""<script>
+enable_thebe_js = """(function () {
   const button = document.getElementById("enable-thebe");
   const status = document.getElementById("thebe-status");
+  // Bundled scripts load on every page that uses any module
+  if (!button || !status) return;
 
   function updateStatus(message, color = "#555") {
     status.textContent = `Thebe: ${message}`;
@@ -69,5 +124,248 @@ enable_thebe_script="""<script>
       updateStatus("Error: Thebe not loaded", "red");
     }
   });
-</script>
+})();
+"""
+
+search_js = """(function () {
+  // Shared by every search box on the page; repeated copies of this script are no-ops
+  if (window.pxpSearch) return;
+  const base = "/assets/search/";
+  const shards = {};
+  let index = null;
+  let docs = null;
+
+  function fetchJson(url) {
+    return fetch(base + url).then(response => {
+      if (!response.ok) throw new Error(`${response.status} ${url}`);
+      return response.json();
+    });
+  }
+
+  function parseShard(buffer) {
+    const bytes = new Uint8Array(buffer);
+    // Hosts that send .gz files with Content-Encoding: gzip hand over JSON the browser already inflated
+    if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) {
+      return JSON.parse(new TextDecoder().decode(bytes));
+    }
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).json();
+  }
+
+  function fetchShard(url) {
+    if (!shards[url]) {
+      shards[url] = fetch(base + url)
+        .then(response => {
+          if (!response.ok) throw new Error(`${response.status} ${url}`);
+          return response.arrayBuffer();
+        })
+        .then(parseShard)
+        .catch(error => {
+          // Forget the failure so the next query retries the shard
+          delete shards[url];
+          throw error;
+        });
+    }
+    return shards[url];
+  }
+
+  function loadIndex() {
+    if (!index) {
+      index = fetchJson("index.json").then(data => {
+        data.stopwords = new Set(data.stopwords);
+        return data;
+      }).catch(error => {
+        index = null;
+        throw error;
+      });
+    }
+    return index;
+  }
+
+  function tokenize(meta, text) {
+    // Mirrors search_index.tokenize
+    return (text.toLowerCase().match(/[a-z0-9]+/g) || [])
+      .filter(t => t.length >= meta.prefix && !meta.stopwords.has(t));
+  }
+
+  // Weights per doc id for one term; the last query term also matches as a prefix
+  function lookup(meta, term, partial) {
+    const url = meta.shards[term.slice(0, meta.prefix)];
+    if (!url) return Promise.resolve(new Map());
+    return fetchShard(url).then(postings => {
+      const weights = new Map();
+      const terms = partial ? Object.keys(postings).filter(t => t.startsWith(term)) : [term];
+      terms.forEach(t => {
+        const list = postings[t] || [];
+        const idf = Math.log(1 + meta.count / (list.length / 2 || 1));
+        for (let i = 0; i < list.length; i += 2) {
+          weights.set(list[i], (weights.get(list[i]) || 0) + list[i + 1] * idf);
+        }
+      });
+      return weights;
+    });
+  }
+
+  window.pxpSearch = function (query, limit = 20) {
+    return loadIndex().then(meta => {
+      const terms = tokenize(meta, query);
+      if (!terms.length) return [];
+      // Only the shards for the query's term prefixes are downloaded
+      const lookups = terms.map((term, i) => lookup(meta, term, i === terms.length - 1));
+      if (!docs) {
+        docs = fetchJson(meta.docs).catch(error => {
+          docs = null;
+          throw error;
+        });
+      }
+      return Promise.all([docs, Promise.all(lookups)]).then(([table, results]) => {
+        const scores = new Map(results[0]);
+        results.slice(1).forEach(weights => {
+          scores.forEach((score, id) => {
+            if (weights.has(id)) scores.set(id, score + weights.get(id));
+            else scores.delete(id);
+          });
+        });
+        return Array.from(scores)
+          .sort((a, b) => b[1] - a[1])
+          .slice(0, limit)
+          .map(([id, score]) => ({ title: table[id][0], url: table[id][1], description: table[id][2], score: score }));
+      });
+    });
+  };
+
+  function init(el) {
+    const input = el.querySelector(".pxp-search-input");
+    const list = el.querySelector(".pxp-search-results");
+    let timer = null;
+    let latest = 0;
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        const ticket = ++latest;
+        window.pxpSearch(input.value).then(results => {
+          if (ticket !== latest) return;
+          list.replaceChildren(...results.map(result => {
+            const item = document.createElement("li");
+            const link = document.createElement("a");
+            link.href = result.url;
+            link.textContent = result.title;
+            item.append(link);
+            if (result.description) item.append(` → ${result.description}`);
+            return item;
+          }));
+        }).catch(error => {
+          if (ticket !== latest) return;
+          const item = document.createElement("li");
+          item.className = "pxp-search-error";
+          item.textContent = "Search is unavailable right now.";
+          list.replaceChildren(item);
+          console.error("pxpSearch:", error);
+        });
+      }, 150);
+    });
+  }
+
+  function initAll() {
+    document.querySelectorAll("[data-search]").forEach(init);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initAll);
+  } else {
+    initAll();
+  }
+})();
+"""
+
+large_table_js = """(function () {
+  // Shared by every large table on the page; repeated copies of this script are no-ops
+  if (window.pxpLargeTables) return;
+  window.pxpLargeTables = true;
+
+  function init(pager) {
+    const url = new URL(pager.dataset.largeTable, window.location.href);
+    const body = pager.closest(".large-table").querySelector("tbody");
+    const status = pager.querySelector(".large-table-status");
+    const [prev, next] = pager.querySelectorAll("[data-page]");
+    const pages = {};
+    let index = null;
+    let current = 0;
+
+    function loadIndex() {
+      if (!index) index = fetch(url).then(response => response.json());
+      return index;
+    }
+
+    // Pages are fetched the first time they are shown and kept for the visit
+    function loadPage(meta, number) {
+      if (!pages[number]) {
+        pages[number] = fetch(new URL(meta.pages[number], url)).then(response => response.json());
+      }
+      return pages[number];
+    }
+
+    function show(number) {
+      loadIndex().then(meta => loadPage(meta, number).then(rows => {
+        body.replaceChildren(...rows.map(cells => {
+          const tr = document.createElement("tr");
+          cells.forEach(cell => {
+            const td = document.createElement("td");
+            // Cells are HTML rendered from the table's Markdown at build time
+            td.innerHTML = cell;
+            tr.append(td);
+          });
+          return tr;
+        }));
+        current = number;
+        const first = number * meta.page_size;
+        status.textContent = `Rows ${first + 1}–${first + rows.length} of ${meta.rows}`;
+        prev.disabled = number === 0;
+        next.disabled = number >= meta.pages.length - 1;
+      }));
+    }
+
+    [prev, next].forEach(button => {
+      button.addEventListener("click", () => show(current + Number(button.dataset.page)));
+    });
+  }
+
+  function initAll() {
+    document.querySelectorAll("[data-large-table]").forEach(init);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initAll);
+  } else {
+    initAll();
+  }
+})();
 """
+
+# Bundle order follows this registry
+SCRIPT_MODULES = {
+    "toggle-all": toggle_all_js,
+    "flipbook": flipbook_js,
+    "enable-thebe": enable_thebe_js,
+    "search": search_js,
+    "large-table": large_table_js,
+}
+
+def inline_script(js):
+    return "```{=html}\n<script>\n" + js + "</script>\n```"
+
+script_sidebar_toggle = """```{=html}
+<script>
+  const sidebar = document.getElementById('quarto-sidebar');
+  const toggle = document.getElementById('sidebarToggle');
+
+  toggle?.addEventListener('click', () => {
+    sidebar.classList.toggle('d-none');
+  });
+</script>
+```"""
+
+sidebar_toggle_html = """<button id="sidebarToggle" class="btn btn-sm" aria-label="Toggle sidebar"
+  style="position: fixed; top: 1rem; left: 1rem; z-index: 1050;">
+  <i class="bi bi-layout-sidebar-inset"></i>
+</button>"""
@@ -0,0 +1,349 @@
+"""
+search_index.py
+Prebuilt, sharded client-side search index for pages with a search
+section. Built only with generate.py --search-index; a site that adds a
+search section lists assets/search/ under project resources in _quarto.yml
+so Quarto publishes the index.
+
+Documents come from the page JSON specs (meta, body text, FAQ items,
+tables, quick-link descriptions) and from the descriptions of the other
+entries in links.json. Terms are split into gzip-compressed shards by
+their first PREFIX_LENGTH characters, so the browser only downloads the
+shards its query touches:
+
+    assets/search/index.json             shard list, stopwords, docs URL
+    assets/search/docs.json              [title, url, description] per doc id
+    assets/search/shards/<prefix>.json.gz  {term: [doc id, weight, ...]}
+
+Doc ids are stable across builds and each document's postings are digested
+per shard, so only the shards a changed document's terms moved in are rewritten.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+from load_links import link_map, tables
+from manifest import track_file
+from placeholders import PLACEHOLDER_PATTERN
+from table_sources import section_source, table_rows
+
+SEARCH_DIR = Path("assets") / "search"
+SHARD_DIR = SEARCH_DIR / "shards"
+STATE_PATH = Path("tools") / "generation" / ".cache" / "search-state.json"
+INDEX_VERSION = 2
+PREFIX_LENGTH = 2
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+# Field weights added to a term's count per occurrence
+TITLE_WEIGHT = 5
+DESCRIPTION_WEIGHT = 2
+STOPWORDS = frozenset("""
+a an and are as at be but by can do for from has have how i if in into is it its
+of on or our so than that the their then there these this to was we what when
+which will with you your
+""".split())
+# Section keys that hold markup options or references rather than readable text
+SKIP_KEYS = {
+    "type", "img", "src", "class", "callout-type", "language", "level", "icon",
+    "items_path", "img-json-path", "json-path", "skip-reason", "tabs",
+    "table-name", "table-names", "table-path", "page-size", "page-list", "links-list",
+}
+
+# -----------------------
+# Text Extraction
+# -----------------------
+def tokenize(text):
+    """Lower-cased alphanumeric terms; mirrored by the client in scripts.search_js."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) >= PREFIX_LENGTH and t not in STOPWORDS]
+
+def placeholder_text(match):
+    entry = dict.get(link_map, match.group(1)) or {}
+    # Branded placeholders are markup split into spans; joining keeps "PxP" one word
+    return entry.get("label") or TAG_PATTERN.sub("", entry.get("link", ""))
+
+def plain_text(text):
+    return TAG_PATTERN.sub(" ", PLACEHOLDER_PATTERN.sub(placeholder_text, str(text)))
+
+def link_text(keys):
+    for key in keys:
+        entry = link_map.get(key)
+        if entry:
+            yield entry.get("label", "")
+            yield entry.get("description", "")
+
+# Term counts per table; a table shown on many pages is tokenized once per process
+_table_terms = {}
+
+def table_terms(source):
+    """Term counts of a table's headers and cells, an inline list or a {"path": ...} file."""
+    if isinstance(source, dict):
+        track_file(source["path"])
+        stat = os.stat(source["path"])
+        key = (source["path"], stat.st_mtime_ns, stat.st_size)
+    else:
+        # Inline tables are keyed by identity; the cached entry holds the list so the id stays unique
+        key = id(source)
+    cached = _table_terms.get(key)
+    if cached is None or (not isinstance(source, dict) and cached[0] is not source):
+        terms = Counter()
+        for row in table_rows(source):
+            for text in (*row.keys(), *row.values()):
+                terms.update(tokenize(plain_text(text)))
+        cached = _table_terms[key] = (source, terms)
+    return cached[1]
+
+def section_text(value, tables_used):
+    """Yield every readable string in a compiled section, resolving link lists.
+
+    Table sources are appended to tables_used rather than yielded row by row.
+    """
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        if "table-name" in value or "table-path" in value:
+            tables_used.append(section_source(value, tables))
+        for name in value.get("table-names", []):
+            yield name
+            tables_used.append(tables.get(name, []))
+        yield from link_text(value.get("page-list", []))
+        yield from link_text(value.get("links-list", []))
+        for tab in value.get("tabs", []):
+            yield tab.get("title", "")
+            for section in tab.get("sections", []):
+                yield from section_text(section, tables_used)
+        for key, v in value.items():
+            if key not in SKIP_KEYS:
+                yield from section_text(v, tables_used)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from section_text(v, tables_used)
+
+def weigh_terms(title, description, texts, tables_used=()):
+    terms = Counter()
+    for term in tokenize(plain_text(title)):
+        terms[term] += TITLE_WEIGHT
+    for term in tokenize(plain_text(description)):
+        terms[term] += DESCRIPTION_WEIGHT
+    for text in texts:
+        terms.update(tokenize(plain_text(text)))
+    for source in tables_used:
+        terms.update(table_terms(source))
+    return dict(terms)
+
+def page_url(link):
+    return re.sub(r"\.(qmd|ipynb)$", ".html", link)
+
+def page_document(page_details, ir):
+    """Search document for a generated page from its compiled IR."""
+    meta = ir.meta
+    tables_used = []
+    title = meta.get("title") or page_details.get("label", "")
+    description = meta.get("description") or page_details.get("description", "")
+    return {
+        "title": plain_text(title).strip(),
+        "url": page_url(page_details.get("link", "")),
+        "description": plain_text(description).strip(),
+        "terms": weigh_terms(title, description, section_text(ir.body, tables_used), tables_used),
+    }
+
+def link_document(entry):
+    """Search document for a links.json entry that is not a generated page."""
+    label = entry.get("label", "")
+    description = entry.get("description", "")
+    return {
+        "title": plain_text(label).strip(),
+        "url": page_url(entry.get("link", "")),
+        "description": plain_text(description).strip(),
+        "terms": weigh_terms(label, description, []),
+    }
+
+# -----------------------
+# Index Files
+# -----------------------
+def load_state(path=STATE_PATH):
+    """Doc ids, docs-table rows and per-shard digests of the indexed documents, or None to rebuild."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        with open(SEARCH_DIR / "index.json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != INDEX_VERSION or index.get("version") != INDEX_VERSION:
+        return None
+    state["shards"] = index.get("shards", {})
+    return state
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # json.dumps, unlike json.dump, runs on the C encoder
+        f.write(json.dumps({k: v for k, v in state.items() if k != "shards"}, separators=(",", ":")))
+    os.replace(tmp_path, path)
+
+def digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+def write_if_changed(path, data):
+    """Write bytes atomically unless the file already holds them; returns True if written."""
+    path = Path(path)
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return True
+
+def versioned(path, data):
+    return f"{path.relative_to(SEARCH_DIR).as_posix()}?v={hashlib.sha256(data).hexdigest()[:10]}"
+
+def read_shard(path):
+    try:
+        return json.loads(gzip.decompress(path.read_bytes()))
+    except (OSError, ValueError):
+        return {}
+
+def write_search_index(state, changes):
+    """Apply {key: document, or None to drop it} to the index; returns shards rewritten.
+
+    Only the shards where a changed document's postings differ are read and
+    rewritten. Doc ids are stable, so every other posting stays valid.
+    """
+    entries = state["docs"]
+    # prefix -> ids whose postings in that shard are replaced, and their new postings
+    touched = {}
+    additions = {}
+    for key in sorted(k for k, doc in changes.items() if doc is None and k in entries):
+        entry = entries.pop(key)
+        state["free"].append(entry["id"])
+        for prefix in entry["prefixes"]:
+            touched.setdefault(prefix, set()).add(entry["id"])
+
+    for key, doc in sorted(changes.items()):
+        if doc is None:
+            continue
+        entry = entries.get(key)
+        if entry:
+            doc_id = entry["id"]
+        elif state["free"]:
+            doc_id = state["free"].pop()
+        else:
+            doc_id = state["next"]
+            state["next"] += 1
+        by_prefix = {}
+        for term, weight in sorted(doc["terms"].items()):
+            by_prefix.setdefault(term[:PREFIX_LENGTH], {})[term] = weight
+        # A shard is rewritten only if this document's postings in it changed
+        old = entry["prefixes"] if entry else {}
+        new = {prefix: digest(terms)[:8] for prefix, terms in by_prefix.items()}
+        for prefix in old.keys() | new.keys():
+            if old.get(prefix) != new.get(prefix):
+                touched.setdefault(prefix, set()).add(doc_id)
+                for term, weight in by_prefix.get(prefix, {}).items():
+                    additions.setdefault(prefix, {}).setdefault(term, []).extend((doc_id, weight))
+        entries[key] = {
+            "id": doc_id,
+            "row": [doc["title"], doc["url"], doc["description"]],
+            "digest": digest(doc),
+            "prefixes": new,
+        }
+
+    compact = {"separators": (",", ":"), "ensure_ascii": False, "sort_keys": True}
+    written = 0
+    shard_urls = state["shards"]
+    for prefix, dropped in sorted(touched.items()):
+        path = SHARD_DIR / f"{prefix}.json.gz"
+        postings = read_shard(path) if prefix in shard_urls else {}
+        for term, pairs in list(postings.items()):
+            kept = [v for i in range(0, len(pairs), 2) if pairs[i] not in dropped for v in pairs[i:i + 2]]
+            if kept:
+                postings[term] = kept
+            else:
+                del postings[term]
+        for term, pairs in additions.get(prefix, {}).items():
+            postings.setdefault(term, []).extend(pairs)
+        if not postings:
+            path.unlink(missing_ok=True)
+            shard_urls.pop(prefix, None)
+            continue
+        # mtime=0 keeps the bytes (and the version hash) stable across builds
+        data = gzip.compress(json.dumps(postings, **compact).encode("utf-8"), mtime=0)
+        written += write_if_changed(path, data)
+        shard_urls[prefix] = versioned(path, data)
+
+    # Ids of removed documents are left as null rows until they are reused
+    table = [None] * state["next"]
+    for entry in entries.values():
+        table[entry["id"]] = entry["row"]
+    docs_data = json.dumps(table, **compact).encode("utf-8")
+    write_if_changed(SEARCH_DIR / "docs.json", docs_data)
+
+    index = {
+        "version": INDEX_VERSION,
+        "prefix": PREFIX_LENGTH,
+        "stopwords": sorted(STOPWORDS),
+        "docs": versioned(SEARCH_DIR / "docs.json", docs_data),
+        "count": len(entries),
+        "shards": shard_urls,
+    }
+    write_if_changed(SEARCH_DIR / "index.json", json.dumps(index, **compact).encode("utf-8"))
+    return written
+
+def forget_search_state():
+    """Drop the index state after pages changed without --search-index.
+
+    The published index is left in place; the next --search-index run finds
+    no state and rebuilds it in full.
+    """
+    STATE_PATH.unlink(missing_ok=True)
+
+def update_search_index(page_data, page_docs, compile_ir):
+    """Apply freshly rendered page documents to the index.
+
+    page_docs maps page keys to documents built while rendering; generated
+    pages that were never indexed are compiled with compile_ir(page_details),
+    which is given the page's links.json entry.
+    Other links.json entries are re-indexed only when their entries change.
+    Nothing is read beyond the index state when no document changed.
+    """
+    state = load_state()
+    if state is None:
+        # Missing or outdated index: start over from an empty one
+        for stale in SHARD_DIR.glob("*.json.gz"):
+            stale.unlink()
+        state = {"version": INDEX_VERSION, "links": None, "next": 0, "free": [], "docs": {}, "shards": {}}
+    entries = state["docs"]
+
+    generated = {key for key, details in page_data.items() if details.get("generate")}
+    linked = {
+        key: details for key, details in page_data.items()
+        if key not in generated and details.get("label")
+    }
+    docs = dict(page_docs)
+    for key in sorted(generated - entries.keys() - docs.keys()):
+        ir = compile_ir(page_data[key])
+        if ir:
+            docs[key] = page_document(page_data[key], ir)
+    links_digest = digest(linked)
+    if links_digest != state["links"]:
+        docs.update((key, link_document(details)) for key, details in linked.items())
+        state["links"] = links_digest
+
+    changes = {key: None for key in entries if key not in generated and key not in linked}
+    changes.update(
+        (key, doc) for key, doc in docs.items()
+        if key not in entries or entries[key]["digest"] != digest(doc)
+    )
+    if not changes:
+        print(f"🔎 Search index: {len(entries)} documents, unchanged")
+        return
+    written = write_search_index(state, changes)
+    save_state(state)
+    print(f"🔎 Search index: {len(entries)} documents, {len(changes)} updated, {written} shard(s) rewritten")
@@ -0,0 +1,198 @@
+"""
+table_sources.py
+Row sources and the large-table mode for the table renderers.
+
+A table is either a list of row dicts in tables.json or a reference to an
+external file, {"path": "....csv"} in tables.json or "table-path" on the
+section, streamed one row at a time (CSV with a header row, or JSON lines).
+
+Tables up to LARGE_TABLE_ROWS rows stay inline pipe tables. Longer ones
+are written to assets/tables/<slug>-<digest>/ as JSON pages of PAGE_SIZE rows
+and rendered as an HTML table showing the first page; the "large-table"
+script module fetches the other pages when the reader pages through them.
+Cells are rendered to HTML the way Pandoc renders pipe-table cells: inline
+Markdown (code, links, emphasis) and {{{key}}} placeholders included.
+"""
+import csv
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+from itertools import islice
+from pathlib import Path
+
+from load_links import link_map
+from manifest import track_file
+from placeholders import PLACEHOLDER_PATTERN
+
+TABLES_DIR = Path("assets") / "tables"
+LARGE_TABLE_ROWS = 100
+PAGE_SIZE = 50
+# Inline Markdown in cells; delimiters must hug their text, as in Pandoc
+INLINE_PATTERN = re.compile(
+    r"(?P<ticks>`+)(?P<code>.+?)(?P=ticks)"
+    r"|\[(?P<label>[^\]]*)\]\((?P<href>[^)\s]+)\)"
+    r"|\*\*(?P<strong>[^*\s](?:[^*]*[^*\s])?)\*\*"
+    r"|\*(?P<em>[^*\s](?:[^*]*[^*\s])?)\*"
+    r"|(?<!\w)_(?P<em_>[^_\s](?:[^_]*[^_\s])?)_(?!\w)"
+    r"|(?P<tag></?[A-Za-z][^<>]*>)"
+)
+
+# -----------------------
+# Sources
+# -----------------------
+def stream_file(path):
+    """Yield the rows of a CSV or JSON-lines file as dicts, one at a time."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in (".csv", ".jsonl", ".ndjson"):
+        raise ValueError(f"Unsupported table source (expected .csv or .jsonl): {path}")
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if suffix == ".csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def table_rows(source):
+    """Yield the rows of a table: an inline list of dicts or a {"path": ...} file reference."""
+    if isinstance(source, dict):
+        track_file(source["path"])
+        yield from stream_file(source["path"])
+    else:
+        yield from source or []
+
+def section_source(item, tables):
+    """Source of a markdown-table section: its table-path, else its tables.json entry."""
+    if "table-path" in item:
+        return {"path": item["table-path"]}
+    return tables.get(item.get("table-name"), [])
+
+def split_large(rows, threshold=LARGE_TABLE_ROWS):
+    """Return (first rows, remaining iterator, is_large) reading at most threshold + 1 rows."""
+    rows = iter(rows)
+    head = list(islice(rows, threshold + 1))
+    return head, rows, len(head) > threshold
+
+# -----------------------
+# Large-table mode
+# -----------------------
+def table_slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-") or "table"
+
+def table_dir(name, source_id, page_size):
+    """Directory for one table paged one way; the digest keeps same-named tables apart."""
+    digest = hashlib.sha256(f"{source_id}\0{page_size}".encode("utf-8")).hexdigest()[:10]
+    return TABLES_DIR / f"{table_slug(name)}-{digest}"
+
+def write_if_changed(path, content):
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Pages render in parallel workers and may share a table; replace atomically
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+def versioned_page(table_dir, number, cells):
+    """Write one page of cell rows; returns its URL relative to the table directory."""
+    content = json.dumps(cells, ensure_ascii=False, separators=(",", ":"))
+    write_if_changed(table_dir / f"page-{number}.json", content)
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:10]
+    return f"page-{number}.json?v={digest}"
+
+def substitute_placeholders(text):
+    """Replace {{{key}}} with the key's link; link_map records the keys as page dependencies."""
+    def lookup(match):
+        entry = link_map.get(match.group(1))
+        return entry.get("link", "") if entry else match.group(0)
+    return PLACEHOLDER_PATTERN.sub(lookup, text)
+
+def inline_html(text):
+    """HTML for a cell's inline Markdown; raw inline tags pass through, other text is escaped."""
+    parts = []
+    pos = 0
+    for match in INLINE_PATTERN.finditer(text):
+        parts.append(html.escape(text[pos:match.start()], quote=False))
+        if match.group("ticks"):
+            parts.append(f"<code>{html.escape(match.group('code').strip(), quote=False)}</code>")
+        elif match.group("href"):
+            parts.append(f'<a href="{html.escape(match.group("href"))}">{inline_html(match.group("label"))}</a>')
+        elif match.group("strong"):
+            parts.append(f"<strong>{inline_html(match.group('strong'))}</strong>")
+        elif match.group("em") or match.group("em_"):
+            parts.append(f"<em>{inline_html(match.group('em') or match.group('em_'))}</em>")
+        else:
+            parts.append(match.group("tag"))
+        pos = match.end()
+    parts.append(html.escape(text[pos:], quote=False))
+    return "".join(parts)
+
+def cell_html(value):
+    return inline_html(substitute_placeholders(str(value)))
+
+def html_row(cells, tag="td"):
+    return "<tr>" + "".join(f"<{tag}>{cell}</{tag}>" for cell in cells) + "</tr>\n"
+
+def iter_large_table(name, source_id, rows, page_size=PAGE_SIZE):
+    """Yield a paginated HTML table; rows are consumed one page at a time.
+
+    source_id names where the rows come from (a file path or a tables.json
+    entry). The first page is rendered inline. Every page is also written to
+    assets/tables/<slug>-<digest>/page-N.json, with index.json listing the pages.
+    """
+    rows = iter(rows)
+    first = list(islice(rows, page_size))
+    columns = list(first[0].keys()) if first else []
+    as_cells = lambda page: [[cell_html(row.get(c, "")) for c in columns] for row in page]
+    directory = table_dir(name, source_id, page_size)
+
+    first_cells = as_cells(first)
+    yield "\n```{=html}\n"
+    yield '<div class="large-table">\n'
+    yield '<table class="large-table-data">\n<thead>' + html_row(map(cell_html, columns), "th").rstrip("\n") + "</thead>\n<tbody>\n"
+    for cells in first_cells:
+        yield html_row(cells)
+    yield "</tbody>\n</table>\n"
+
+    pages = [versioned_page(directory, 1, first_cells)]
+    total = len(first)
+    while True:
+        page = list(islice(rows, page_size))
+        if not page:
+            break
+        total += len(page)
+        pages.append(versioned_page(directory, len(pages) + 1, as_cells(page)))
+    for stale in directory.glob("page-*.json"):
+        if int(stale.stem.split("-")[1]) > len(pages):
+            stale.unlink()
+
+    index = json.dumps(
+        {"columns": columns, "rows": total, "page_size": page_size, "pages": pages},
+        indent=1, ensure_ascii=False,
+    ) + "\n"
+    index_path = directory / "index.json"
+    write_if_changed(index_path, index)
+    track_file(str(index_path))
+    digest = hashlib.sha256(index.encode("utf-8")).hexdigest()[:10]
+
+    yield (
+        f'<div class="large-table-pager" data-large-table="/{index_path.as_posix()}?v={digest}">'
+        '<button type="button" data-page="-1" disabled>Previous</button> '
+        f'<span class="large-table-status">Rows 1–{len(first)} of {total}</span> '
+        f'<button type="button" data-page="1"{" disabled" if len(pages) < 2 else ""}>Next</button>'
+        "</div>\n"
+    )
+    yield "</div>\n```\n"
+
+def remove_stale_tables(tracked_files):
+    """Delete table directories whose index.json no page tracks any more."""
+    if not TABLES_DIR.is_dir():
+        return
+    used = {Path(path).parent for path in tracked_files}
+    for directory in TABLES_DIR.iterdir():
+        if directory.is_dir() and directory not in used:
+            shutil.rmtree(directory)
+            print(f"🧹 Removed unused table pages: {directory}")
@@ -0,0 +1,150 @@
+"""
+json_cache.py
+Shared JSON loader for the page and CSS generators.
+
+Parsed files are cached in-process keyed by path, mtime and size, so a file
+referenced from many pages (shared FAQ groups, nested sections, links.json)
+is parsed once per build. An optional on-disk pickle cache carries parsed
+data over to the next run. Returned objects are shared between callers and
+must not be mutated. The cache is shared by build stages running in
+threads, so every access to it goes through _lock.
+
+The page and CSS generators share one pickle and may save it at the same
+time, from threads or from separate processes. A save writes a private
+temporary file, keeps the entries other writers stored for files that are
+still unchanged, and then replaces the pickle in one step.
+"""
+import json
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+
+_cache = {}
+_lock = threading.Lock()
+# Serialises saves from stage threads of one process
+_save_lock = threading.Lock()
+_disk_path = None
+_disk_dirty = False
+
+stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def load_json(path, missing_ok=False):
+    """Load a JSON file through the cache.
+
+    Args:
+        path: Path to the JSON file.
+        missing_ok: Return None instead of raising if the file does not exist.
+
+    Returns:
+        The parsed JSON content.
+    """
+    global _disk_dirty
+    key = os.path.normpath(str(path))
+    try:
+        signature = _signature(key)
+    except FileNotFoundError:
+        with _lock:
+            _cache.pop(key, None)
+        if missing_ok:
+            return None
+        raise
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == signature:
+            stats["disk_hits" if cached[2] else "hits"] += 1
+            if cached[2]:
+                _cache[key] = (signature, cached[1], False)
+            return cached[1]
+        stats["misses"] += 1
+
+    # Parsed outside the lock; two threads missing on the same file both parse it
+    with open(key, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with _lock:
+        _cache[key] = (signature, data, False)
+        _disk_dirty = True
+    return data
+
+def cache_stats():
+    """Return a copy of this process's hit/miss counters.
+
+    Page worker processes (generate.py --jobs) keep counters of their own,
+    which are not included.
+    """
+    with _lock:
+        return dict(stats)
+
+def clear_cache():
+    """Drop every in-process entry and reset the counters."""
+    with _lock:
+        _cache.clear()
+        for name in stats:
+            stats[name] = 0
+
+# -----------------------
+# On-disk cache
+# -----------------------
+def _read_disk(path):
+    """Entries of the pickle at path, or {} if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return {}
+
+def _is_current(key, signature):
+    try:
+        return _signature(key) == signature
+    except OSError:
+        return False
+
+def enable_disk_cache(path):
+    """Seed the in-process cache from a pickle written by a previous run."""
+    global _disk_path, _disk_dirty
+    _disk_path = Path(path)
+    entries = _read_disk(_disk_path)
+    if not entries:
+        return
+    with _lock:
+        for key, (signature, data) in entries.items():
+            if key not in _cache:
+                # Third field marks entries that came from disk, for the hit counters
+                _cache[key] = (signature, data, True)
+        # Files parsed before the cache was enabled only dirty it if the disk copy is outdated
+        _disk_dirty = any(entries.get(key, (None,))[0] != cached[0] for key, cached in _cache.items())
+
+def save_disk_cache():
+    """Write the in-process cache to disk if the disk cache is enabled and anything changed."""
+    global _disk_dirty
+    if _disk_path is None or not _disk_dirty:
+        return
+    with _save_lock:
+        with _lock:
+            snapshot = list(_cache.items())
+            _disk_dirty = False
+        entries = {
+            key: (signature, data)
+            for key, (signature, data, _) in snapshot
+            if _is_current(key, signature)
+        }
+        # Keep what other writers cached for files this process never read
+        for key, (signature, data) in _read_disk(_disk_path).items():
+            if key not in entries and _is_current(key, signature):
+                entries[key] = (signature, data)
+        _disk_path.parent.mkdir(parents=True, exist_ok=True)
+        # A private temporary name; concurrent writers never share one
+        fd, tmp_path = tempfile.mkstemp(dir=_disk_path.parent, prefix=f"{_disk_path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, _disk_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,142 @@
+"""
+jupyterlite_cache.py
+Content-keyed artifact cache for JupyterLite builds.
+
+A build is keyed on jupyter_lite_config.json, jupyter-lite.json, every
+file under the trees they point the build at (contents, extra static and
+labextension paths, lite files and extensions; files/ by default), the
+notebooks, the copied custom CSS and the installed JupyterLite version. An up-to-date jl-build is left alone, a previously built key is
+restored from the cache and only an unseen key runs `jupyter lite build`.
+"""
+
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+CACHE_DIR = Path("tools") / ".cache" / "jupyterlite"
+BUILD_DIR = "jl-build"
+CONFIG_FILES = ["jupyter_lite_config.json", "jupyter-lite.json"]
+# Content directory `jupyter lite build` reads when the config names none
+DEFAULT_CONTENTS = "files"
+# LiteBuildConfig options and jupyter-lite.json keys that list input directories
+BUILD_PATH_OPTIONS = ["contents", "extra_static_paths", "extra_labextensions_paths"]
+LITE_PATH_KEYS = ["lite-files", "lite-extensions"]
+# Artifacts kept per JupyterLite directory, newest first
+KEEP_ARTIFACTS = 3
+
+def sync_file(source, destination):
+    """Copy source to destination unless the contents already match; returns True if copied."""
+    destination = Path(destination)
+    if destination.exists() and filecmp.cmp(source, destination, shallow=False):
+        return False
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, destination)
+    return True
+
+def jupyterlite_version():
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        return version("jupyterlite-core")
+    except (ImportError, PackageNotFoundError):
+        return "unknown"
+
+def read_config(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def input_trees(lite_dir):
+    """Directories the build reads, as configured in jupyter_lite_config.json and jupyter-lite.json."""
+    lite_dir = Path(lite_dir)
+    build_config = read_config(lite_dir / "jupyter_lite_config.json").get("LiteBuildConfig", {})
+    lite_config = read_config(lite_dir / "jupyter-lite.json")
+    trees = [DEFAULT_CONTENTS]
+    for option in BUILD_PATH_OPTIONS:
+        trees += build_config.get(option, [])
+    for key in LITE_PATH_KEYS:
+        trees += lite_config.get(key, [])
+    return sorted({os.path.normpath(lite_dir / tree) for tree in trees})
+
+def is_build_input(rel):
+    return rel.parts[0] != BUILD_DIR and ".ipynb_checkpoints" not in rel.parts
+
+def build_inputs(lite_dir, css_dir):
+    """Files that determine the JupyterLite output, relative to lite_dir."""
+    lite_dir = Path(lite_dir)
+    inputs = {name for name in CONFIG_FILES if (lite_dir / name).exists()}
+    for notebook in lite_dir.rglob("*.ipynb"):
+        if is_build_input(notebook.relative_to(lite_dir)):
+            inputs.add(notebook.relative_to(lite_dir).as_posix())
+    # Every file in the configured trees; a tree may sit outside lite_dir
+    for tree in [*input_trees(lite_dir), os.path.normpath(css_dir)]:
+        for path in Path(tree).rglob("*"):
+            rel = Path(os.path.relpath(path, lite_dir))
+            if path.is_file() and is_build_input(rel):
+                inputs.add(rel.as_posix())
+    return sorted(inputs)
+
+def build_key(lite_dir, css_dir):
+    """Hash of every build input (path and contents) plus the JupyterLite version."""
+    digest = hashlib.sha256(jupyterlite_version().encode("utf-8"))
+    for rel in build_inputs(lite_dir, css_dir):
+        digest.update(rel.encode("utf-8"))
+        with open(Path(lite_dir) / rel, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+class JupyterLiteCache:
+    """Artifacts for one JupyterLite directory, stored under CACHE_DIR/<slug>/<key>."""
+    def __init__(self, lite_dir, cache_dir=CACHE_DIR):
+        self.lite_dir = Path(lite_dir)
+        slug = "-".join(self.lite_dir.resolve().parts[-2:])
+        self.root = Path(cache_dir) / slug
+        self.state_path = self.root / "state.json"
+
+    def _state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def current_key(self):
+        """Key of the build currently in jl-build, if it came through the cache."""
+        if not (self.lite_dir / BUILD_DIR).exists():
+            return None
+        return self._state().get("current")
+
+    def restore(self, key):
+        """Replace jl-build with the cached artifact for key; returns False if there is none."""
+        artifact = self.root / key
+        if not artifact.is_dir():
+            return False
+        build_dir = self.lite_dir / BUILD_DIR
+        if build_dir.exists():
+            shutil.rmtree(build_dir)
+        shutil.copytree(artifact, build_dir)
+        self._mark(key)
+        return True
+
+    def store(self, key):
+        """Copy the fresh jl-build into the cache and drop the oldest artifacts."""
+        artifact = self.root / key
+        if artifact.exists():
+            shutil.rmtree(artifact)
+        shutil.copytree(self.lite_dir / BUILD_DIR, artifact)
+        self._mark(key)
+
+    def _mark(self, key):
+        state = self._state()
+        history = [key] + [k for k in state.get("history", []) if k != key]
+        for stale in history[KEEP_ARTIFACTS:]:
+            shutil.rmtree(self.root / stale, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"current": key, "history": history[:KEEP_ARTIFACTS]}, f, indent=1)
+        os.replace(tmp_path, self.state_path)
@@ -1,22 +1,31 @@
-import json
+import argparse
 import dash
+import plotly.graph_objects as go
+from functools import lru_cache
+from pathlib import Path
 from dash import dcc, html, Input, Output
-from course_graph import generate_course_figure, export_course_graph
+from course_graph import (
+    CourseGraph,
+    cached_course_figure,
+    export_course_graph,
+    figure_dict,
+    generate_course_figure
+)
+
+CONFIG_PATH = Path(__file__).resolve().parent / "course-paths.json"
+# Filtered figures kept per server process; repeated filter combinations skip Plotly entirely
+FIGURE_CACHE_SIZE = 128
 
-# Load config
-with open("course-paths.json") as f:
-    graph_data = json.load(f)
+# Load config and the prebuilt figure (rebuilt only when course-paths.json changes)
+graph_data, figure = cached_course_figure(CONFIG_PATH)
 
 meta = graph_data.get("meta", {})
 title = meta.get("title", "Learning Pathway")
 output_name = meta.get("output_name", "course-path")
 output_dir = meta.get("output_dir", "site")
 
-# Create figure
-fig = generate_course_figure(graph_data["nodes"], graph_data["edges"], title=title)
-
-# Optional: export static HTML and PNG
-export_course_graph(fig, output_dir, output_name, save_png=True)
+# Adjacency index, built once per process and shared by every request
+graph = CourseGraph(graph_data["nodes"], graph_data["edges"])
 
 # Dash app
 app = dash.Dash(__name__)
@@ -24,21 +33,86 @@ app.title = title
 
 app.layout = html.Div([
     html.H1(title),
-    dcc.Graph(id='course-graph', figure=fig),
-    html.Div(id='click-output')
+    html.Div([
+        dcc.Dropdown(
+            id='topic-filter', placeholder="Topic",
+            options=[{"label": topic, "value": topic} for topic in graph.topics()]
+        ),
+        dcc.Dropdown(
+            id='level-filter', placeholder="Level",
+            options=[{"label": f"Level {level}", "value": level} for level in graph.levels()]
+        ),
+        dcc.Dropdown(
+            id='node-filter', placeholder="Related to node",
+            options=[{"label": node["label"], "value": node["id"]} for node in graph.nodes]
+        ),
+        dcc.RadioItems(
+            id='relation-filter', value="both", inline=True,
+            options=[
+                {"label": "Ancestors", "value": "ancestors"},
+                {"label": "Descendants", "value": "descendants"},
+                {"label": "Both", "value": "both"},
+            ]
+        ),
+    ], style={"display": "grid", "gridTemplateColumns": "repeat(4, 1fr)", "gap": "0.5rem"}),
+    dcc.Graph(id='course-graph', figure=figure),
+    html.Div(id='click-output', children=html.A(
+        "Click a node to visit content", id='click-link', target="_blank"
+    ))
 ])
 
+# Runs in the browser: following a node link needs no server round-trip
+app.clientside_callback(
+    """
+    function (clickData) {
+        const point = clickData && clickData.points[0];
+        if (!point || !point.customdata) {
+            return [null, "Click a node to visit content"];
+        }
+        return [point.customdata, "Go to topic"];
+    }
+    """,
+    Output('click-link', 'href'),
+    Output('click-link', 'children'),
+    Input('course-graph', 'clickData')
+)
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def filtered_figure(topic, level, node_id, relation):
+    """Figure for one filter combination; the unfiltered graph is the prebuilt artifact."""
+    if not topic and level is None and not node_id:
+        return figure
+    nodes, edges = graph.subgraph(topic=topic, level=level, node_id=node_id, relation=relation)
+    return figure_dict(generate_course_figure(nodes, edges, title=title))
+
 
 @app.callback(
-    Output('click-output', 'children'),
-    Input('course-graph', 'clickData')
+    Output('course-graph', 'figure'),
+    Input('topic-filter', 'value'),
+    Input('level-filter', 'value'),
+    Input('node-filter', 'value'),
+    Input('relation-filter', 'value'),
+    prevent_initial_call=True
 )
-def display_click(clickData):
-    if clickData and clickData["points"]:
-        url = clickData["points"][0]["customdata"]
-        return html.A("Go to topic", href=url, target="_blank")
-    return "Click a node to visit content"
+def update_figure(topic, level, node_id, relation):
+    return filtered_figure(topic, level, node_id, relation)
+
+
+def export_static(save_png=False):
+    """Write the static HTML (and optionally PNG) export; an offline step, not part of serving."""
+    export_dir = CONFIG_PATH.parent / output_dir
+    export_course_graph(go.Figure(figure), export_dir, output_name, save_png=save_png)
+    print(f"[Info] Exported {output_name} to {export_dir}")
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="Serve or export the course graph.")
+    parser.add_argument("--export", action="store_true", help="Write the static HTML export and exit")
+    parser.add_argument("--png", action="store_true", help="With --export, also write a PNG (needs kaleido)")
+    args = parser.parse_args()
+
+    if args.export:
+        export_static(save_png=args.png)
+    else:
+        app.run(debug=True)
@@ -1,34 +1,235 @@
+import plotly
 import plotly.graph_objects as go
+import numpy as np
+import hashlib
+import json
 import os
+from collections import defaultdict, namedtuple
+from pathlib import Path
 
+# Above this many nodes the figure switches to WebGL traces and hover-only labels
+WEBGL_THRESHOLD = 1000
+# Barycenter sweeps (down + up) used to reduce edge crossings
+SWEEPS = 8
+# Rows compared at once when counting crossings, to bound memory on wide layers
+CROSSING_CHUNK = 1024
+
+# Serialized figures, keyed by course-paths.json, this module and the Plotly version
+CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "course-graph"
+
+# x/y cover the nodes followed by the dummy vertices that route long edges;
+# segments is a (k, 2) array of vertex indices, one row per drawn line segment
+Layout = namedtuple("Layout", ["x", "y", "segments"])
+
+
+def assign_layers(nodes, edges):
+    """Return a layer per node: its "level" if set, else the longest path from its ancestors."""
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    given = np.array([node.get("level", np.nan) for node in nodes], dtype=float)
+    fixed = ~np.isnan(given)
+    base = given[fixed].min() if fixed.any() else 0
+    layers = np.where(fixed, given, base)
+    if not edges or fixed.all():
+        return layers
+
+    src = np.array([index[s] for s, _ in edges])
+    dst = np.array([index[t] for _, t in edges])
+    # Relax until stable; the bound keeps cycles from looping forever
+    for _ in range(len(nodes)):
+        relaxed = layers.copy()
+        np.maximum.at(relaxed, dst, layers[src] + 1)
+        relaxed = np.where(fixed, given, relaxed)
+        if np.array_equal(relaxed, layers):
+            break
+        layers = relaxed
+    return layers
 
-def generate_course_figure(nodes, edges, title="Learning Pathway"):
-    """Generate a Plotly figure object from node and edge lists."""
-    id_to_index = {node["id"]: i for i, node in enumerate(nodes)}
-    x_vals = [node.get("level", 0) for node in nodes]
-    y_vals = list(range(len(nodes)))
-
-    fig = go.Figure()
-
-    for i, node in enumerate(nodes):
-        fig.add_trace(go.Scatter(
-            x=[x_vals[i]], y=[y_vals[i]],
-            mode='markers+text',
-            marker=dict(size=40, color=node.get("color", "#dddddd")),
-            text=node["label"], textposition="top center",
-            hoverinfo="text",
-            customdata=[node.get("url", "#")]
-        ))
 
+def split_long_edges(layers, edges, index):
+    """Insert a dummy vertex per layer crossed by an edge.
+
+    Returns (vertex layers, segments between adjacent layers, same-layer segments).
+    """
+    vertex_layers = list(layers)
+    segments, flat = [], []
     for source, target in edges:
-        i, j = id_to_index[source], id_to_index[target]
-        fig.add_shape(
-            type="line",
-            x0=x_vals[i], y0=y_vals[i],
-            x1=x_vals[j], y1=y_vals[j],
-            line=dict(color="gray", width=2)
-        )
+        u, v = index[source], index[target]
+        if layers[u] > layers[v]:
+            u, v = v, u
+        if layers[u] == layers[v]:
+            flat.append((u, v))
+            continue
+        previous = u
+        for layer in range(int(layers[u]) + 1, int(layers[v])):
+            vertex_layers.append(layer)
+            dummy = len(vertex_layers) - 1
+            segments.append((previous, dummy))
+            previous = dummy
+        segments.append((previous, v))
+    as_array = lambda pairs: np.array(pairs, dtype=int).reshape(-1, 2)
+    return np.array(vertex_layers, dtype=int), as_array(segments), as_array(flat)
+
+
+def count_crossings(pos, segments, vertex_layers):
+    """Number of crossing segment pairs between each pair of adjacent layers."""
+    total = 0
+    seg_layers = vertex_layers[segments[:, 0]]
+    for layer in np.unique(seg_layers):
+        pair = segments[seg_layers == layer]
+        a, b = pos[pair[:, 0]], pos[pair[:, 1]]
+        for start in range(0, len(pair), CROSSING_CHUNK):
+            stop = start + CROSSING_CHUNK
+            crossed = (a[start:stop, None] - a[None, :]) * (b[start:stop, None] - b[None, :]) < 0
+            total += np.count_nonzero(crossed)
+    # Every crossing pair was seen from both sides
+    return total // 2
+
+
+def barycenter_sweep(pos, segments, vertex_layers, downward):
+    """Reorder each layer by the mean position of its neighbours in the previous layer."""
+    src, dst = (segments[:, 0], segments[:, 1]) if downward else (segments[:, 1], segments[:, 0])
+    count = np.bincount(dst, minlength=len(pos))
+    order = np.unique(vertex_layers)
+    for layer in (order[1:] if downward else order[::-1][1:]):
+        # Recomputed per layer: the previous layer may have just been reordered
+        weight = np.bincount(dst, weights=pos[src], minlength=len(pos))
+        bary = np.where(count > 0, weight / np.maximum(count, 1), pos)
+        members = np.flatnonzero(vertex_layers == layer)
+        ranked = members[np.argsort(bary[members], kind="stable")]
+        pos[ranked] = np.arange(len(ranked))
+    return pos
+
+
+def layered_layout(nodes, edges, sweeps=SWEEPS):
+    """Sugiyama-style layout: layers from levels, dummy vertices, barycenter crossing reduction."""
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    layers = assign_layers(nodes, edges)
+    origin = layers.min() if len(layers) else 0
+    vertex_layers, segments, flat = split_long_edges((layers - origin).astype(int), edges, index)
+
+    # Start from file order within each layer
+    pos = np.zeros(len(vertex_layers))
+    for layer in np.unique(vertex_layers):
+        members = np.flatnonzero(vertex_layers == layer)
+        pos[members] = np.arange(len(members))
+
+    best, fewest = pos.copy(), count_crossings(pos, segments, vertex_layers)
+    for sweep in range(sweeps):
+        if fewest == 0:
+            break
+        pos = barycenter_sweep(pos, segments, vertex_layers, downward=sweep % 2 == 0)
+        crossings = count_crossings(pos, segments, vertex_layers)
+        if crossings < fewest:
+            best, fewest = pos.copy(), crossings
+
+    # Center every layer on y = 0, first vertex at the top
+    sizes = np.bincount(vertex_layers)
+    y = (sizes[vertex_layers] - 1) / 2 - best
+    x = vertex_layers + origin
+    return Layout(x=x.astype(float), y=y, segments=np.vstack([segments, flat]))
+
+
+class CourseGraph:
+    """Adjacency index over course-paths.json, built once and queried per filter."""
+    def __init__(self, nodes, edges):
+        self.nodes = list(nodes)
+        self.edges = [tuple(edge) for edge in edges]
+        self.ids = {node["id"] for node in self.nodes}
+        self.children = defaultdict(list)
+        self.parents = defaultdict(list)
+        for source, target in self.edges:
+            self.children[source].append(target)
+            self.parents[target].append(source)
+        self.by_topic = defaultdict(set)
+        self.by_level = defaultdict(set)
+        for node in self.nodes:
+            for topic in node.get("topics", []):
+                self.by_topic[topic].add(node["id"])
+            self.by_level[node.get("level")].add(node["id"])
+
+    def topics(self):
+        return sorted(self.by_topic)
+
+    def levels(self):
+        return sorted(level for level in self.by_level if level is not None)
+
+    def reachable(self, node_id, adjacency):
+        """node_id and every node reachable from it through adjacency."""
+        seen = {node_id}
+        stack = [node_id]
+        while stack:
+            for neighbour in adjacency.get(stack.pop(), []):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return seen
+
+    def subgraph(self, topic=None, level=None, node_id=None, relation="both"):
+        """Return (nodes, edges) matching every given filter, in file order.
 
+        relation picks the "ancestors", "descendants" or "both" of node_id.
+        """
+        selected = set(self.ids)
+        if topic:
+            selected &= self.by_topic.get(topic, set())
+        if level is not None:
+            selected &= self.by_level.get(level, set())
+        if node_id in self.ids:
+            related = {node_id}
+            if relation in ("ancestors", "both"):
+                related |= self.reachable(node_id, self.parents)
+            if relation in ("descendants", "both"):
+                related |= self.reachable(node_id, self.children)
+            selected &= related
+        nodes = [node for node in self.nodes if node["id"] in selected]
+        edges = [(s, t) for s, t in self.edges if s in selected and t in selected]
+        return nodes, edges
+
+
+def segment_coordinates(values, segments):
+    """Flatten segments into one line trace: x0, x1, gap, x0, x1, gap, ..."""
+    gaps = np.full(len(segments), np.nan)
+    return np.column_stack([values[segments[:, 0]], values[segments[:, 1]], gaps]).ravel()
+
+
+def node_hover(node):
+    description = node.get("description", [])
+    if isinstance(description, str):
+        description = [description]
+    return "<br>".join([f"<b>{node['label']}</b>", *description])
+
+
+def generate_course_figure(nodes, edges, title="Learning Pathway"):
+    """Generate a Plotly figure object from node and edge lists.
+
+    All edges are drawn by one line trace and all nodes by one marker trace,
+    so the figure size does not grow by a trace or shape per element.
+    """
+    layout = layered_layout(nodes, edges)
+    count = len(nodes)
+    large = count > WEBGL_THRESHOLD
+    scatter = go.Scattergl if large else go.Scatter
+
+    edge_trace = scatter(
+        x=segment_coordinates(layout.x, layout.segments),
+        y=segment_coordinates(layout.y, layout.segments),
+        mode='lines',
+        line=dict(color="gray", width=1 if large else 2),
+        hoverinfo="skip",
+    )
+    node_trace = scatter(
+        x=layout.x[:count], y=layout.y[:count],
+        mode='markers' if large else 'markers+text',
+        marker=dict(size=10 if large else 40, color=[node.get("color", "#dddddd") for node in nodes]),
+        text=[node["label"] for node in nodes], textposition="top center",
+        hovertext=[node_hover(node) for node in nodes],
+        hoverinfo="text",
+        customdata=[node.get("url", "#") for node in nodes],
+    )
+    fig = go.Figure(data=[edge_trace, node_trace])
+
+    # Layers are centered ranks, so the y span gives the widest layer
+    widest = np.ptp(layout.y) + 1 if count else 0
     fig.update_layout(
         title=title,
         showlegend=False,
@@ -36,7 +237,7 @@ def generate_course_figure(nodes, edges, title="Learning Pathway"):
         margin=dict(t=40, b=20, l=20, r=20),
         xaxis=dict(visible=False),
         yaxis=dict(visible=False),
-        height=600
+        height=max(600, 40 * widest)
     )
     return fig
 
@@ -46,10 +247,53 @@ def export_course_graph(fig, output_dir, output_name, save_png=False):
     os.makedirs(output_dir, exist_ok=True)
     html_path = os.path.join(output_dir, f"{output_name}.html")
     fig.write_html(html_path, include_plotlyjs="cdn")
-    
+
     if save_png:
         try:
             png_path = os.path.join(output_dir, f"{output_name}.png")
             fig.write_image(png_path)
         except Exception as e:
             print(f"[Warning] PNG export failed: {e}")
+
+
+def figure_key(config_bytes):
+    """Cache key for the figure built from a course-paths file's raw bytes."""
+    digest = hashlib.sha256(config_bytes)
+    digest.update(Path(__file__).read_bytes())
+    digest.update(plotly.__version__.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def cached_course_figure(config_path, cache_dir=CACHE_DIR):
+    """Return (graph data, figure dict), building the figure only for an unseen key.
+
+    The figure is stored as Plotly JSON, which dcc.Graph accepts as-is, so
+    loading an artifact skips both the layout and Figure validation.
+    """
+    config_path = Path(config_path)
+    config_bytes = config_path.read_bytes()
+    graph_data = json.loads(config_bytes)
+    cache_dir = Path(cache_dir)
+    artifact = cache_dir / f"{config_path.stem}-{figure_key(config_bytes)}.json"
+    try:
+        with open(artifact, "r", encoding="utf-8") as f:
+            return graph_data, json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    title = graph_data.get("meta", {}).get("title", "Learning Pathway")
+    fig = generate_course_figure(graph_data["nodes"], graph_data["edges"], title=title)
+    content = fig.to_json()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob(f"{config_path.stem}-*.json"):
+        stale.unlink()
+    tmp_path = artifact.with_suffix(".tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, artifact)
+    print(f"[Info] Built course figure: {artifact}")
+    return graph_data, json.loads(content)
+
+
+def figure_dict(fig):
+    """Plotly JSON for a figure, ready to hand to dcc.Graph without re-validation."""
+    return json.loads(fig.to_json())
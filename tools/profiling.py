@@ -0,0 +1,187 @@
+"""
+profiling.py
+Opt-in wall time and peak memory profiling for the build tools.
+
+Nothing is recorded until enable() is called (build_all.py --profile). Each
+profiled scope records its wall time and the peak traced memory above the
+level at which it started; nested scopes are inclusive of their children.
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+_enabled = False
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+
+def enable():
+    """Start recording profiled scopes and tracing memory allocations."""
+    global _enabled
+    _enabled = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def is_enabled():
+    return _enabled
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def scope(category, name):
+    """Record wall time and peak memory for the enclosed block.
+
+    Yields the record dict; setting record["seconds"] inside the block
+    overrides the measured wall time.
+    """
+    if not _enabled:
+        yield {}
+        return
+    stack = _stack()
+    if stack:
+        # Keep the parent's peak before resetting it for this scope
+        stack[-1]["max"] = max(stack[-1]["max"], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    frame = {"start": current, "max": current}
+    stack.append(frame)
+    record = {"category": category, "name": str(name)}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = max(frame["max"], tracemalloc.get_traced_memory()[1])
+        stack.pop()
+        if stack:
+            stack[-1]["max"] = max(stack[-1]["max"], peak)
+        record.setdefault("seconds", elapsed)
+        record["peak_bytes"] = peak - frame["start"]
+        with _lock:
+            _records.append(record)
+
+def profile_generator(category, name, gen):
+    """Wrap a generator, counting only the time spent producing its chunks."""
+    if not _enabled:
+        yield from gen
+        return
+    with scope(category, name) as record:
+        elapsed = 0.0
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(gen)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield chunk
+        record["seconds"] = elapsed
+
+def profile_transform(category, name, transform, chunks):
+    """Profile transform(chunks), excluding the time spent producing `chunks` upstream."""
+    if not _enabled:
+        yield from transform(chunks)
+        return
+    upstream = 0.0
+    source = iter(chunks)
+
+    def timed_source():
+        nonlocal upstream
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(source)
+            except StopIteration:
+                return
+            finally:
+                upstream += time.perf_counter() - start
+            yield chunk
+
+    with scope(category, name) as record:
+        total = 0.0
+        output = transform(timed_source())
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(output)
+            except StopIteration:
+                break
+            finally:
+                total += time.perf_counter() - start
+            yield chunk
+        record["seconds"] = total - upstream
+
+def profiled_generator_function(category, name, func):
+    """Decorate a generator function so every call is profiled under (category, name)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        gen = func(*args, **kwargs)
+        return profile_generator(category, name, gen) if _enabled else gen
+    return wrapper
+
+def profiled_function(category, name, func):
+    """Decorate a plain function so every call is profiled under (category, name)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with scope(category, name):
+            return func(*args, **kwargs)
+    return wrapper
+
+# -----------------------
+# Reporting
+# -----------------------
+def summarize():
+    """Aggregate records per (category, name): calls, total/max seconds and peak memory."""
+    summary = {}
+    with _lock:
+        records = list(_records)
+    for record in records:
+        key = (record["category"], record["name"])
+        entry = summary.setdefault(key, {
+            "category": record["category"],
+            "name": record["name"],
+            "calls": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "peak_bytes": 0,
+        })
+        entry["calls"] += 1
+        entry["total_seconds"] += record["seconds"]
+        entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+        entry["peak_bytes"] = max(entry["peak_bytes"], record["peak_bytes"])
+    return sorted(summary.values(), key=lambda e: e["total_seconds"], reverse=True)
+
+def write_report(path, top_n=15):
+    """Write the JSON report to path and print the top_n entries per category."""
+    summary = summarize()
+    with _lock:
+        records = list(_records)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "records": records}, f, indent=2)
+
+    print(f"\n📊 Profile written to {path}")
+    categories = []
+    for entry in summary:
+        if entry["category"] not in categories:
+            categories.append(entry["category"])
+    for category in categories:
+        entries = [e for e in summary if e["category"] == category][:top_n]
+        print(f"\n  {category} (top {len(entries)} by total time)")
+        for e in entries:
+            print(
+                f"    {e['total_seconds'] * 1000:10.2f} ms  "
+                f"{e['peak_bytes'] / 1024:10.1f} KiB  "
+                f"x{e['calls']:<5} {e['name']}"
+            )
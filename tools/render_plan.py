@@ -0,0 +1,233 @@
+"""
+render_plan.py
+Decide how much of the site Quarto has to render after generation.
+
+The hashes of every renderable page, every site resource and the shared
+Quarto inputs are stored after each successful render. The next build
+compares against them: changed pages are rendered in one `quarto render`
+call, changed resources (generated CSS, images, JupyterLite builds) are copied into the
+output directory, a changed _metadata.yml re-renders its directory and only
+a change to a shared input (_quarto.yml, extensions, included partials)
+falls back to a full `quarto render`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from fnmatch import fnmatch
+from pathlib import Path
+
+import yaml
+
+RENDER_STATE = Path("tools") / ".cache" / "render-state.json"
+STATE_VERSION = 2
+
+PAGE_SUFFIXES = {".qmd", ".ipynb", ".md"}
+# Quarto does not render README files
+SKIP_PAGES = {"README.md", "README.qmd"}
+# Inputs every page depends on; "_quarto-<profile>.yml" files are added at scan time
+SHARED_INPUTS = ["_quarto.yml", "_extensions", "assets/html"]
+SKIP_DIRS = {"node_modules", "__pycache__"}
+# Build outputs and environments that hold notebooks but no pages (JupyterLite copies them into jl-build)
+NON_PAGE_DIRS = {"jl-build", "venv", "site-packages"}
+
+class RenderPlan:
+    """What to render: mode is "full", "incremental" or "none"."""
+    def __init__(self, mode, reason="", pages=(), dirs=(), resources=(), removed=()):
+        self.mode = mode
+        self.reason = reason
+        self.pages = sorted(pages)
+        self.dirs = sorted(dirs)
+        self.resources = sorted(resources)
+        self.removed = sorted(removed)
+
+    def describe(self):
+        if self.mode == "full":
+            return f"full render ({self.reason})"
+        if self.mode == "none":
+            return "nothing changed since the last render"
+        parts = []
+        if self.pages:
+            parts.append(f"{len(self.pages)} page(s)")
+        if self.dirs:
+            parts.append(f"{len(self.dirs)} directory(ies)")
+        if self.resources or self.removed:
+            parts.append(f"{len(self.resources)} resource(s) to copy, {len(self.removed)} to remove")
+        return "incremental render: " + ", ".join(parts)
+
+# -----------------------
+# Scanning
+# -----------------------
+class FileHasher:
+    """Content hashes cached by mtime and size across builds."""
+    def __init__(self, cached=None):
+        self.cached = cached or {}
+        self.files = {}
+
+    def __call__(self, path):
+        stat = os.stat(path)
+        entry = self.cached.get(path)
+        if not (entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size):
+            with open(path, "rb") as f:
+                entry = [stat.st_mtime_ns, stat.st_size, hashlib.sha256(f.read()).hexdigest()]
+        self.files[path] = entry
+        return entry[2]
+
+def walk_files(root, rel="", skip_hidden=True, skip_dirs=SKIP_DIRS):
+    """Yield project-relative POSIX paths of the files under root/rel."""
+    base = Path(root) / rel
+    if base.is_file():
+        yield Path(rel).as_posix()
+        return
+    for dirpath, dirnames, filenames in os.walk(base):
+        # Quarto ignores files and directories starting with "_" or "."
+        dirnames[:] = [
+            d for d in dirnames
+            if d not in skip_dirs and not (skip_hidden and d.startswith(("_", ".")))
+        ]
+        for name in filenames:
+            yield Path(os.path.relpath(os.path.join(dirpath, name), root)).as_posix()
+
+def render_filter(project):
+    """Whether a path is a render target under project.render (globs, "!" to exclude)."""
+    patterns = project.get("render", []) or []
+    include = [p.rstrip("/") for p in patterns if not p.startswith("!")]
+    exclude = [p[1:].rstrip("/") for p in patterns if p.startswith("!")]
+    matches = lambda path, pattern: fnmatch(path, pattern) or path.startswith(f"{pattern}/")
+
+    def selected(path):
+        if include and not any(matches(path, p) for p in include):
+            return False
+        return not any(matches(path, p) for p in exclude)
+    return selected
+
+def quarto_config(root):
+    with open(Path(root) / "_quarto.yml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+def scan(root, hasher):
+    """Hash the shared inputs, directory metadata, pages and resources of the project."""
+    config = quarto_config(root)
+    project = config.get("project", {})
+    output_dir = project.get("output-dir", "_site")
+
+    shared = {}
+    profiles = [p.name for p in Path(root).glob("_quarto-*.yml")]
+    for entry in SHARED_INPUTS + profiles:
+        if (Path(root) / entry).exists():
+            for path in walk_files(root, entry, skip_hidden=False):
+                shared[path] = hasher(os.path.join(root, path))
+
+    metadata, pages, resources = {}, {}, {}
+    is_target = render_filter(project)
+    for path in walk_files(root, skip_dirs=SKIP_DIRS | NON_PAGE_DIRS):
+        name = Path(path).name
+        if name == "_metadata.yml":
+            metadata[path] = hasher(os.path.join(root, path))
+        elif Path(path).suffix not in PAGE_SUFFIXES:
+            continue
+        elif name.startswith("_"):
+            # "_" pages are never rendered themselves, only included into others
+            shared[path] = hasher(os.path.join(root, path))
+        elif name not in SKIP_PAGES and is_target(path):
+            pages[path] = hasher(os.path.join(root, path))
+
+    resource_entries = list(project.get("resources", []) or [])
+    resource_entries += config.get("format", {}).get("html", {}).get("css", []) or []
+    for entry in resource_entries:
+        entry = entry.rstrip("/")
+        if not (Path(root) / entry).exists():
+            continue
+        for path in walk_files(root, entry):
+            if path not in pages:
+                resources[path] = hasher(os.path.join(root, path))
+
+    return {
+        "output_dir": output_dir,
+        "shared": shared,
+        "metadata": metadata,
+        "pages": pages,
+        "resources": resources,
+    }
+
+def changed_keys(old, new):
+    return {k for k in new if old.get(k) != new[k]}
+
+# -----------------------
+# Planning
+# -----------------------
+def load_state(state_path):
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == STATE_VERSION else {}
+
+def plan_render(root, state_path=RENDER_STATE):
+    """Compare the project against the last successful render; returns (plan, snapshot)."""
+    state = load_state(Path(root) / state_path)
+    hasher = FileHasher(state.get("files"))
+    current = scan(root, hasher)
+    snapshot = {"version": STATE_VERSION, "files": hasher.files, **current}
+
+    if not state:
+        return RenderPlan("full", "no previous render state"), snapshot
+    if not (Path(root) / current["output_dir"]).exists():
+        return RenderPlan("full", f"{current['output_dir']} is missing"), snapshot
+    shared_changed = changed_keys(state.get("shared", {}), current["shared"])
+    shared_changed |= state.get("shared", {}).keys() - current["shared"].keys()
+    if shared_changed:
+        return RenderPlan("full", f"shared input changed: {', '.join(sorted(shared_changed))}"), snapshot
+    # Added or removed pages change the navigation of every page
+    if state.get("pages", {}).keys() != current["pages"].keys():
+        return RenderPlan("full", "pages were added or removed"), snapshot
+
+    dirs = {
+        Path(path).parent.as_posix()
+        for path in changed_keys(state.get("metadata", {}), current["metadata"])
+        | (state.get("metadata", {}).keys() - current["metadata"].keys())
+    }
+    if "." in dirs:
+        return RenderPlan("full", "_metadata.yml changed"), snapshot
+    pages = {
+        path for path in changed_keys(state["pages"], current["pages"])
+        if not any(path.startswith(f"{d}/") for d in dirs)
+    }
+    resources = changed_keys(state.get("resources", {}), current["resources"])
+    removed = state.get("resources", {}).keys() - current["resources"].keys()
+    if not (pages or dirs or resources or removed):
+        return RenderPlan("none"), snapshot
+    return RenderPlan("incremental", pages=pages, dirs=dirs, resources=resources, removed=removed), snapshot
+
+def save_state(root, snapshot, state_path=RENDER_STATE):
+    path = Path(root) / state_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# -----------------------
+# Execution
+# -----------------------
+def execute_plan(root, plan, output_dir="_site"):
+    """Run the quarto renders and resource copies in plan; raises CalledProcessError on failure."""
+    if plan.mode == "full":
+        subprocess.run(["quarto", "render"], cwd=root, check=True)
+        return
+    targets = plan.dirs + plan.pages
+    if targets:
+        # One quarto process for every target: its startup dominates small renders
+        print(f"🖨️ Rendering {', '.join(targets)}")
+        subprocess.run(["quarto", "render", *targets], cwd=root, check=True)
+    for path in plan.resources:
+        destination = Path(root) / output_dir / path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(Path(root) / path, destination)
+    for path in plan.removed:
+        stale = Path(root) / output_dir / path
+        if stale.exists():
+            stale.unlink()
@@ -0,0 +1,129 @@
+"""
+stages.py
+Small dependency-ordered stage scheduler for build_all.py.
+
+Each stage declares the paths it reads and writes. A stage depends on every
+stage whose outputs overlap its inputs (same path or one inside the other),
+and independent stages run concurrently in a thread pool. Two stages may
+only write overlapping paths if one of them depends on the other.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import PurePosixPath
+
+from profiling import scope
+
+class Stage:
+    """A named unit of build work with declared input and output paths."""
+    def __init__(self, name, func, inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = [PurePosixPath(p) for p in inputs]
+        self.outputs = [PurePosixPath(p) for p in outputs]
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+class BuildError(Exception):
+    """Raised when one or more stages fail; dependents of a failed stage are skipped."""
+    def __init__(self, failed, skipped):
+        self.failed = failed
+        self.skipped = skipped
+        names = ", ".join(failed)
+        super().__init__(f"{len(failed)} stage(s) failed: {names}")
+
+def paths_overlap(a, b):
+    return a == b or a in b.parents or b in a.parents
+
+def stage_dependencies(stages):
+    """Map each stage name to the names of the stages that produce its inputs."""
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = {
+            other.name
+            for other in stages
+            if other is not stage
+            and any(paths_overlap(i, o) for i in stage.inputs for o in other.outputs)
+        }
+    # Reject cycles up front rather than deadlocking
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Stage dependency cycle between: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+    check_output_conflicts(stages, deps)
+    return deps
+
+def check_output_conflicts(stages, deps):
+    """Reject stages that write overlapping paths and may run at the same time."""
+    def upstream(name, seen=None):
+        seen = set() if seen is None else seen
+        for dep in deps[name]:
+            if dep not in seen:
+                seen.add(dep)
+                upstream(dep, seen)
+        return seen
+
+    ancestors = {stage.name: upstream(stage.name) for stage in stages}
+    for i, stage in enumerate(stages):
+        for other in stages[i + 1:]:
+            if stage.name in ancestors[other.name] or other.name in ancestors[stage.name]:
+                continue
+            for a in stage.outputs:
+                for b in other.outputs:
+                    if paths_overlap(a, b):
+                        raise ValueError(f"Stages '{stage.name}' and '{other.name}' both write {a} / {b}")
+
+def run_stages(stages, max_workers=None):
+    """Run stages in dependency order, concurrently where possible.
+
+    Returns a dict of stage name -> wall time in seconds. Raises BuildError
+    after all runnable stages have finished if any stage raised.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    deps = stage_dependencies(stages)
+    done, failed, skipped = set(), {}, []
+    timings = {}
+    running = {}
+
+    def timed(stage):
+        start = time.perf_counter()
+        with scope("stage", stage.name):
+            stage.func()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as pool:
+        pending = dict(deps)
+        while pending or running:
+            blocked = True
+            while blocked:
+                blocked = [n for n, d in pending.items() if d & (set(failed) | set(skipped))]
+                for name in blocked:
+                    skipped.append(name)
+                    del pending[name]
+            for name in [n for n, d in pending.items() if d <= done]:
+                print(f"\n▶️ Stage '{name}' started")
+                running[pool.submit(timed, by_name[name])] = name
+                del pending[name]
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    timings[name] = future.result()
+                except Exception as e:
+                    failed[name] = e
+                    print(f"❌ Stage '{name}' failed: {type(e).__name__}: {e}")
+                else:
+                    done.add(name)
+                    print(f"✅ Stage '{name}' finished in {timings[name]:.2f}s")
+
+    if failed:
+        raise BuildError(failed, skipped)
+    return timings
@@ -0,0 +1,55 @@
+"""
+watch.py
+Polling file watcher used by build_all.py --watch.
+"""
+
+import os
+import time
+from pathlib import Path
+
+SKIP_DIRS = {"_site", ".quarto", ".git", ".cache", "node_modules", "jl-build", "__pycache__"}
+
+def snapshot(root, include):
+    """Map every file under root accepted by include(path) to its (mtime_ns, size)."""
+    state = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if not include(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+def changed_paths(old, new):
+    """Return the paths added, removed or modified between two snapshots."""
+    return {
+        path for path in old.keys() | new.keys()
+        if old.get(path) != new.get(path)
+    }
+
+def watch(root, include, on_change, interval=0.5):
+    """Poll root every `interval` seconds and call on_change(paths) when files change.
+
+    Exceptions raised by on_change are reported and the watcher keeps running.
+    Stops on KeyboardInterrupt.
+    """
+    state = snapshot(root, include)
+    try:
+        while True:
+            time.sleep(interval)
+            new_state = snapshot(root, include)
+            changed = changed_paths(state, new_state)
+            state = new_state
+            if not changed:
+                continue
+            try:
+                on_change({str(Path(p).relative_to(root)) for p in changed})
+            except Exception as e:
+                print(f"❌ Rebuild failed: {type(e).__name__}: {e}")
+    except KeyboardInterrupt:
+        print("\n👋 Stopping watcher.")